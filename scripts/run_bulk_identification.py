@@ -1,20 +1,209 @@
 """
 Bulk identification and enrichment of local album images.
-Run with: python scripts/run_bulk_identification.py
+Run with: python scripts/run_bulk_identification.py [--workers 8] [--batch-size 20]
+Large backfills: python scripts/run_bulk_identification.py --batch [--batch-id ID ...]
+Keep running and process new images as they arrive: --watch
+
+Progress is journaled per image, so a re-run after a crash reuses identification
+and Discogs results that were already paid for. --fresh ignores the journal.
 """
 
-from pyprojroot import here
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from vinyl_recorder.collection_tracker import CollectionTracker
 from vinyl_recorder.vinyl_cover_identifier import VinylIdentifier
+from vinyl_recorder.batch_identifier import BatchIdentifier
 from vinyl_recorder.discogs import DiscogEnricher
+from vinyl_recorder.folder_watcher import FolderWatcher
 from vinyl_recorder.ghseets import GoogleSheeter
+from vinyl_recorder.run_journal import DUPLICATE, RunJournal
 from vinyl_recorder.config import get_logger, Config
 
 logger = get_logger()
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=Config.BULK_WORKERS,
+        help="Number of images identified concurrently (1 = sequential)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=Config.SHEET_BATCH_SIZE,
+        help="Number of results appended to the sheet per API call",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Identify with the OpenAI Batch API (cheaper, results within 24h). "
+        "Resumes an unfinished batch from a previous run if there is one",
+    )
+    parser.add_argument(
+        "--batch-id",
+        nargs="+",
+        help="Resume waiting for and ingesting these batch ids",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Start a new journal instead of resuming from the last run's",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, identifying and enriching new images as they are "
+        "added to the images directory",
+    )
+    return parser.parse_args()
+
+
+def format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+
+def append_results(tracker, results: list, journal: RunJournal = None):
+    """
+    Buffer (image_path, result) pairs for appending and journal duplicates.
+    The caller must tracker.flush() once done.
+    """
+    for image_path, result in results:
+        if not tracker.add_result_local(image_path, result) and journal:
+            journal.record_duplicates([image_path.name])
+
+
+def resume_from_journal(tracker, pending_list, journal: RunJournal) -> list:
+    """
+    Append results identified by an interrupted run and skip known duplicates.
+    Returns the images that still need identifying.
+    """
+    remaining = []
+    resumed = []
+    n_duplicates = 0
+
+    for image_path in pending_list:
+        result = journal.identified_result(image_path.name)
+        if result:
+            resumed.append((image_path, result))
+        elif journal.state(image_path.name) == DUPLICATE:
+            n_duplicates += 1
+        else:
+            remaining.append(image_path)
+
+    append_results(tracker, resumed, journal)
+    tracker.flush()
+
+    if resumed or n_duplicates:
+        logger.info(
+            f"Resumed from journal: reused {len(resumed)} results identified by an "
+            f"earlier run, skipped {n_duplicates} images already found to be duplicates"
+        )
+
+    return remaining
+
+
+def identify_all(
+    identifier,
+    tracker,
+    pending_list,
+    workers: int,
+    journal: RunJournal = None,
+):
+    """
+    Identify pending images on a thread pool. Results are journaled as soon
+    as they arrive and appended by the tracker's buffered writer.
+    Returns number of images identified.
+    """
+    n_total = len(pending_list)
+    n_done = 0
+    n_identified = 0
+    start = time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(identifier.identify_image, image_path): image_path
+                for image_path in pending_list
+            }
+
+            for future in as_completed(futures):
+                image_path = futures[future]
+                n_done += 1
+
+                try:
+                    result = future.result()
+                    if journal:
+                        journal.record_identified(image_path.name, result)
+                    append_results(tracker, [(image_path, result)], journal)
+                    n_identified += 1
+                    logger.info(
+                        f"  ✓ Identified {image_path.name}: "
+                        f"{result.artist} - {result.album_title}"
+                    )
+                except Exception as e:
+                    logger.error(f"  ✗ Failed to identify {image_path.name}: {e}")
+
+                elapsed = time.monotonic() - start
+                eta = elapsed / n_done * (n_total - n_done)
+                logger.info(
+                    f"[{n_done}/{n_total}] elapsed {format_eta(elapsed)}, "
+                    f"ETA {format_eta(eta)}"
+                )
+
+                # Rows buffered a while ago go out even if the batch isn't full
+                tracker.flush_if_due()
+    finally:
+        # Rows still buffered, including on an error or Ctrl-C part way through
+        tracker.flush()
+
+    return n_identified
+
+
+def identify_batch(identifier, tracker, pending_list, batch_ids: list = None):
+    """
+    Identify with the Batch API, resuming batch_ids or the last unfinished
+    batches if there are any. Images already in the identification cache
+    are appended without a request. Returns number of images identified.
+    """
+    batcher = BatchIdentifier(identifier=identifier, tracker=tracker)
+    batch_ids = batch_ids or batcher.unfinished_batch_ids()
+    n_cached = 0
+
+    if batch_ids:
+        logger.info(f"Resuming batches {', '.join(batch_ids)}")
+    elif pending_list:
+        batch_ids, n_cached = batcher.submit(pending_list)
+    else:
+        return 0
+
+    return n_cached + batcher.ingest(batch_ids)
+
+
+def watch(identifier, tracker, enricher, workers: int, batch_size: int, journal):
+    """Identify and enrich new images in micro-batches until interrupted."""
+
+    def on_batch(batch):
+        batch = resume_from_journal(tracker, batch, journal)
+        identify_all(identifier, tracker, batch, workers=workers, journal=journal)
+        enricher.enrich_all_pending(journal=journal)
+
+    watcher = FolderWatcher(tracker=tracker, on_batch=on_batch, max_batch=batch_size)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+
+
 def main():
+    args = parse_args()
+
     # Configuration
     IMAGES_DIR = Config.local_image_dir()
 
@@ -23,34 +212,56 @@ def main():
 
     # Initialize components
     sheeter = GoogleSheeter()
-    tracker = CollectionTracker(sheeter=sheeter, images_path=IMAGES_DIR, source="local")
+    tracker = CollectionTracker(
+        sheeter=sheeter,
+        images_path=IMAGES_DIR,
+        source="local",
+        batch_size=args.batch_size,
+    )
     identifier = VinylIdentifier()
     enricher = DiscogEnricher(sheeter=sheeter)
 
+    journal = RunJournal()
+    if args.fresh:
+        journal.clear()
+    journal.compact()
+    tracker.on_flush = journal.record_appended
+
+    if args.watch:
+        watch(identifier, tracker, enricher, args.workers, args.batch_size, journal)
+        return
+
     # Step 1: Identification
     logger.info("Step 1: Identifying albums...")
     pending_list = tracker.get_pending_images()
+    n_identified = 0
 
-    if len(pending_list) == 0:
+    if args.batch or args.batch_id:
+        n_identified = identify_batch(identifier, tracker, pending_list, args.batch_id)
+    elif len(pending_list) == 0:
         logger.info("No new images to process")
     else:
-        logger.info(f"Found {len(pending_list)} images to identify")
-
-        for i, image_path in enumerate(pending_list, 1):
-            logger.info(f"[{i}/{len(pending_list)}] Processing: {image_path.name}")
-            try:
-                result = identifier.identify_image(image_path=image_path)
-                tracker.add_result_local(image_path=image_path, result=result)
-                logger.info(f"  ✓ Identified: {result.artist} - {result.album_title}")
-            except Exception as e:
-                logger.error(f"  ✗ Failed to identify {image_path.name}: {e}")
+        to_identify = resume_from_journal(tracker, pending_list, journal)
+        logger.info(
+            f"Found {len(to_identify)} images to identify "
+            f"({args.workers} workers, batches of {args.batch_size})"
+        )
+        n_identified = identify_all(
+            identifier,
+            tracker,
+            to_identify,
+            workers=args.workers,
+            journal=journal,
+        )
 
     # Step 2: Enrichment
     logger.info("\nStep 2: Enriching with Discogs data...")
-    enricher.enrich_all_pending()
+    enricher.enrich_all_pending(journal=journal)
 
     logger.info("\n✓ Process complete!")
-    logger.info(f"  Identified: {len(pending_list)} albums")
+    logger.info(f"  Identified: {n_identified}/{len(pending_list)} albums")
+    if identifier.cache:
+        logger.info(f"  Identification cache: {identifier.cache.stats}")
 
 
 if __name__ == "__main__":
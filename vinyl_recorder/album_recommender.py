@@ -1,12 +1,58 @@
+import asyncio
+import math
+import random
+from collections import Counter
+
 from vinyl_recorder.llm_client import get_llm_client
-from vinyl_recorder.config import get_logger
+from vinyl_recorder.config import Config, get_logger
 from vinyl_recorder.ghseets import GoogleSheeter
+from vinyl_recorder.ownership_index import OwnershipIndex, normalise_name
 
 from pydantic import BaseModel
-from typing import List
 
 logger = get_logger()
 
+SYSTEM_PROMPT = """
+        You are an expert DJ, record collector, and music curator with deep knowledge of albums, 
+        artists, genres, eras, and musical influences. Your job is to recommend albums that a 
+        listener should consider buying based on their existing music taste, which will be 
+        provided as a list of albums they already own and like.
+
+        You must:
+
+         - Analyse the user’s existing albums to infer their musical taste
+         - Suggest exactly N albums that the user does not already own
+         - Choose albums that are appropriate for the specified taste distance value
+
+        The taste distance scale works as follows:
+
+         - 1: Extremely close matches (same artists, very similar genres, era, or direct stylistic neighbours)
+         - 5: Adjacent and exploratory (related genres, influences, or natural stylistic extensions)
+         - 10: Very exploratory (clearly different, but still plausibly enjoyable given the user’s taste)
+
+        You must prioritise matching the recommendations to the given distance value.
+        Lower distances favour similarity and familiarity; higher distances favour 
+        exploration while remaining musically credible.
+
+        For each suggested album:
+
+         - Provide the artist name
+         - Provide the album title
+
+        Do not:
+
+         - Recommend albums already listed by the user
+         - Mention the distance scale explicitly in the output
+         - Add extra commentary outside the requested structure
+
+        Your output must strictly follow the structured format expected by the application.
+        """
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token for English text."""
+    return len(text) // 4 + 1
+
 
 # ==== DATA MODELS ==== #
 class RecommendedAlbum(BaseModel):
@@ -21,34 +67,97 @@ class RecommendedAlbums(BaseModel):
 # ==== ALBUM RECOMMENDER ==== #
 class AlbumRecommender:
     def __init__(
-        self, sheeter, llm_choice: str = "openai", model_choice: str = "gpt-4o"
+        self,
+        sheeter,
+        llm_choice: str = "openai",
+        model_choice: str = "gpt-4o",
+        max_context_tokens: int = Config.RECOMMENDER_MAX_CONTEXT_TOKENS,
     ):
         logger.info("Starting Album Recommender")
 
         self.llm = get_llm_client(llm=llm_choice, model=model_choice)
         self.sheeter = sheeter
+        self.max_context_tokens = max_context_tokens
+
+        # (store version, album context) so it's only rebuilt when the collection changes
+        self._context_cache = None
+        self._ownership_cache = None  # (store version, OwnershipIndex)
 
-    def build_album_context(self, n_suggestions: int, taste_distance: int) -> str:
+    def build_album_context(self) -> str:
         """
-        Pulls in gsheet with all albums and build a string with the full
-        list of artist-album to pass into the LLM as context in order
-        to recommend new albums.
+        Build a string with the list of owned albums to pass into the LLM
+        as context. This is the stable part of the prompt, so it's memoised
+        until the collection changes and kept byte-identical between calls
+        so provider prompt caching can hit.
+        Large collections are summarised to stay within the token budget.
         """
+        self.sheeter.sync_if_stale()
+        version = self.sheeter.store.version
+        if self._context_cache and self._context_cache[0] == version:
+            return self._context_cache[1]
 
         # ==== Album input ==== #
-        # From google sheets
-        df_sheet = self.sheeter.df_sheet
-        # df_sheet = df_sheet.head(10)
+        # From google sheets (local store)
+        records = self.sheeter.get_records()
+        album_list = [
+            record.get("discogs_title")
+            or f"{record.get('artist')} - {record.get('album_title')}"
+            for record in records
+        ]
+
+        header = (
+            "The following is a list of albums I already own and like:\n"
+            "They represent my overall taste in music.\n\n"
+        )
+        album_lines = [f"{i + 1}. - {album}" for i, album in enumerate(album_list)]
+
+        if estimate_tokens("\n".join(album_lines)) > self.max_context_tokens:
+            album_lines = self.summarise_albums(records, album_lines)
+
+        album_context = header + "\n".join(album_lines) + "\n"
+
+        self._context_cache = (version, album_context)
+        return album_context
+
+    def summarise_albums(self, records: list, album_lines: list) -> list:
+        """
+        Shrink a collection too large for the token budget: count albums per
+        artist, then add a fixed sample of individual albums to fill the budget.
+        """
+        artist_counts = Counter(
+            str(record.get("artist")) for record in records if record.get("artist")
+        )
+        top_artists = ", ".join(
+            f"{artist} ({count})" for artist, count in artist_counts.most_common(100)
+        )
+        summary = [
+            f"My collection has {len(album_lines)} albums, too many to list. "
+            f"Most collected artists (album count): {top_artists}",
+            "",
+            "A sample of the albums:",
+        ]
 
-        album_list = df_sheet["discogs_title"].tolist()
+        budget = self.max_context_tokens - estimate_tokens("\n".join(summary))
+        n_sample = budget // estimate_tokens(max(album_lines, key=len))
+        n_sample = min(max(0, n_sample), len(album_lines))
 
-        album_context = "The following is a list of albums I already own and like:\n"
-        album_context += "They represent my overall taste in music.\n\n"
+        # Fixed seed and original order keep the prompt identical for caching
+        sample_idx = sorted(random.Random(0).sample(range(len(album_lines)), n_sample))
 
-        for i, album in enumerate(album_list):
-            album_context += f"{i + 1}. - {album}\n"
+        logger.info(
+            f"Album context over budget, sending {n_sample} of {len(album_lines)} albums"
+        )
+        return summary + [album_lines[i] for i in sample_idx]
 
-        album_context += f"""
+    def build_request(
+        self, n_suggestions: int, taste_distance: int, exclude: list = None
+    ) -> str:
+        """
+        Per request instructions. Sent after the album context so that
+        changing them doesn't change the cached prompt prefix.
+        exclude lists albums already suggested, for top up requests.
+        """
+        request = f"""
         Based on this list, suggest {n_suggestions} albums I might like.
         DO NOT provide albums already listed.
 
@@ -62,82 +171,154 @@ class AlbumRecommender:
         Match the recommendations as closely as possible to the specified distance.
         """
 
-        return album_context
-
-    def recommend_albums(
-        self, taste_distance: int = 5, n_suggestions: int = 5
-    ) -> RecommendedAlbums:
-        """
-        LLM call to suggest n-albums with a param taste distance (0-10).
+        if exclude:
+            excluded = "\n".join(
+                f"- {album.artist} - {album.album}" for album in exclude
+            )
+            request += f"\nAlso DO NOT suggest any of these:\n{excluded}\n"
 
-        :param taste_distance: int (1-10). A param to control how similar suggestions should
-            be to the input album selection. A value of 1 is very close and 10 almost random.
+        return request
 
-        :param n_suggestions: int. Default 5. Number of albums to return.
-        """
+    def build_messages(
+        self, taste_distance: int, n_suggestions: int, exclude: list = None
+    ) -> list:
+        """Prompt messages for one recommendation request."""
 
         if taste_distance not in range(1, 11):
             raise ValueError("taste_distance must be an integer between 1 and 10")
 
-        if not 1 <= n_suggestions <= 10:
-            raise ValueError("n_suggestions must be between 1 and 10")
-
-        system_prompt = """
-        You are an expert DJ, record collector, and music curator with deep knowledge of albums, 
-        artists, genres, eras, and musical influences. Your job is to recommend albums that a 
-        listener should consider buying based on their existing music taste, which will be 
-        provided as a list of albums they already own and like.
-
-        You must:
-
-         - Analyse the user’s existing albums to infer their musical taste
-         - Suggest exactly N albums that the user does not already own
-         - Choose albums that are appropriate for the specified taste distance value
-
-        The taste distance scale works as follows:
-
-         - 1: Extremely close matches (same artists, very similar genres, era, or direct stylistic neighbours)
-         - 5: Adjacent and exploratory (related genres, influences, or natural stylistic extensions)
-         - 10: Very exploratory (clearly different, but still plausibly enjoyable given the user’s taste)
-
-        You must prioritise matching the recommendations to the given distance value.
-        Lower distances favour similarity and familiarity; higher distances favour 
-        exploration while remaining musically credible.
-
-        For each suggested album:
-
-         - Provide the artist name
-         - Provide the album title
-
-        Do not:
-
-         - Recommend albums already listed by the user
-         - Mention the distance scale explicitly in the output
-         - Add extra commentary outside the requested structure
-
-        Your output must strictly follow the structured format expected by the application.
-        """
-
-        album_context = self.build_album_context(n_suggestions, taste_distance)
-
+        # Stable prefix first (system prompt + collection), variable request last
         messages = [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {
                 "role": "user",
                 "content": [
                     {
                         "type": "text",
-                        "text": album_context,
-                    }
+                        "text": self.build_album_context(),
+                    },
+                    {
+                        "type": "text",
+                        "text": self.build_request(
+                            n_suggestions, taste_distance, exclude
+                        ),
+                    },
                 ],
             },
         ]
 
-        result = self.llm.parse_completion(
-            messages=messages, response_format=RecommendedAlbums
-        )
+        return messages
+
+    # ==== OWNED ALBUM FILTER ==== #
+    def ownership_index(self) -> OwnershipIndex:
+        """Index of owned albums, rebuilt when the collection changes."""
+        version = self.sheeter.store.version
+        if not self._ownership_cache or self._ownership_cache[0] != version:
+            index = OwnershipIndex(self.sheeter.get_records())
+            self._ownership_cache = (version, index)
+        return self._ownership_cache[1]
+
+    def filter_albums(self, albums: list, kept: list, exclude: list = None) -> list:
+        """
+        Append albums that aren't owned, excluded or already in kept to kept.
+        Returns the albums rejected.
+        """
+        index = self.ownership_index()
+        seen = {
+            (normalise_name(a.artist), normalise_name(a.album))
+            for a in kept + list(exclude or [])
+        }
+        rejected = []
+
+        for album in albums:
+            key = (normalise_name(album.artist), normalise_name(album.album))
+            if key in seen or index.owns(album.artist, album.album):
+                rejected.append(album)
+                continue
+            seen.add(key)
+            kept.append(album)
+
+        if rejected:
+            logger.info(
+                f"Dropped {len(rejected)} owned or repeated recommendations: "
+                + ", ".join(f"{a.artist} - {a.album}" for a in rejected)
+            )
+        return rejected
+
+    @staticmethod
+    def n_to_request(n_missing: int) -> int:
+        """Over-generate so owned albums can be dropped without another call."""
+        return math.ceil(n_missing * Config.RECOMMEND_OVERGENERATE)
+
+    @staticmethod
+    def check_n_suggestions(n_suggestions: int):
+        if not 1 <= n_suggestions <= 10:
+            raise ValueError("n_suggestions must be between 1 and 10")
+
+    def recommend_albums(
+        self, taste_distance: int = 5, n_suggestions: int = 5, exclude: list = None
+    ) -> RecommendedAlbums:
+        """
+        LLM call to suggest n-albums with a param taste distance (0-10).
+        Albums already in the collection are filtered out and topped up
+        with follow up calls if needed.
+
+        :param taste_distance: int (1-10). A param to control how similar suggestions should
+            be to the input album selection. A value of 1 is very close and 10 almost random.
+
+        :param n_suggestions: int. Default 5. Number of albums to return.
 
-        return result
+        :param exclude: list of RecommendedAlbum not to suggest, e.g. ones
+            already shown.
+        """
+        self.check_n_suggestions(n_suggestions)
+
+        kept, suggested = [], list(exclude or [])
+        for _ in range(Config.RECOMMEND_MAX_TOPUPS + 1):
+            result = self.llm.parse_completion(
+                messages=self.build_messages(
+                    taste_distance,
+                    self.n_to_request(n_suggestions - len(kept)),
+                    suggested,
+                ),
+                response_format=RecommendedAlbums,
+            )
+            suggested += result.albums
+            self.filter_albums(result.albums, kept, exclude)
+
+            if len(kept) >= n_suggestions:
+                break
+
+        return RecommendedAlbums(albums=kept[:n_suggestions])
+
+    async def arecommend_albums(
+        self, taste_distance: int = 5, n_suggestions: int = 5, exclude: list = None
+    ) -> RecommendedAlbums:
+        """
+        Async version of recommend_albums. Building the prompt and the owned
+        album filter can re-sync the whole sheet, so they run in a thread
+        rather than blocking the event loop.
+        """
+        self.check_n_suggestions(n_suggestions)
+
+        kept, suggested = [], list(exclude or [])
+        for _ in range(Config.RECOMMEND_MAX_TOPUPS + 1):
+            messages = await asyncio.to_thread(
+                self.build_messages,
+                taste_distance,
+                self.n_to_request(n_suggestions - len(kept)),
+                suggested,
+            )
+            result = await self.llm.aparse_completion(
+                messages=messages, response_format=RecommendedAlbums
+            )
+            suggested += result.albums
+            await asyncio.to_thread(self.filter_albums, result.albums, kept, exclude)
+
+            if len(kept) >= n_suggestions:
+                break
+
+        return RecommendedAlbums(albums=kept[:n_suggestions])
 
     def parse_albums(self, results: RecommendedAlbums) -> str:
         albums = results.albums
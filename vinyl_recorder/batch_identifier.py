@@ -0,0 +1,264 @@
+"""
+Identify album covers with the OpenAI Batch API.
+
+Cheaper than one request per image and not rate limited the same way,
+but results can take up to 24h. Meant for large backfills of local images.
+Large runs are split over several batches to stay within the input file
+limits. Submitted batch ids are saved so an interrupted run can be resumed.
+"""
+
+import json
+import time
+
+from vinyl_recorder.config import Config, get_logger
+from vinyl_recorder.vinyl_cover_identifier import VinylData, VinylIdentifier
+
+logger = get_logger()
+
+# Batch statuses that won't change any more
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchIdentifier:
+    def __init__(
+        self,
+        identifier: VinylIdentifier,
+        tracker,
+        max_requests: int = Config.BATCH_MAX_REQUESTS,
+        max_bytes: int = Config.BATCH_MAX_BYTES,
+    ):
+        self.identifier = identifier
+        self.client = identifier.llm.client
+        self.model = identifier.llm.model
+        self.tracker = tracker
+        # Per input file, the Batch API rejects files over its limits
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+
+        self.batch_dir = Config.CACHE_DIR / "batches"
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.batch_dir / f"current_batch_{Config.APP_ENV}.json"
+
+    # ==== STATE ==== #
+    def load_state(self) -> dict:
+        if not self.state_path.exists():
+            return {}
+
+        state = json.loads(self.state_path.read_text())
+        if "batch_id" in state:
+            # Saved before large runs were split over several batches
+            ingested = [state["batch_id"]] if state["ingested"] else []
+            return {"batch_ids": [state["batch_id"]], "ingested_ids": ingested}
+        return state
+
+    def save_state(self, batch_ids: list, ingested_ids: list):
+        self.state_path.write_text(
+            json.dumps({"batch_ids": batch_ids, "ingested_ids": ingested_ids})
+        )
+
+    def unfinished_batch_ids(self) -> list:
+        """Ids of batches that were submitted but not yet ingested."""
+        state = self.load_state()
+        if not state:
+            return []
+        return [
+            batch_id
+            for batch_id in state["batch_ids"]
+            if batch_id not in state["ingested_ids"]
+        ]
+
+    # ==== SUBMIT ==== #
+    def write_requests(self, image_paths: list) -> tuple:
+        """
+        Write one chat completion request per image to JSONL files, starting
+        a new file before one goes over max_requests or max_bytes. Images
+        already in the identification cache are not written.
+        Returns (list of JSONL paths, list of (image_path, cached VinylData)).
+        """
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "VinylData",
+                "schema": VinylData.model_json_schema(),
+            },
+        }
+
+        jsonl_paths = []
+        cached = []
+        f = None
+        n_requests = n_bytes = 0
+
+        try:
+            for image_path in image_paths:
+                image_base64 = self.identifier.load_image_base64(image_path)
+
+                if self.identifier.cache:
+                    result = self.identifier.cache.get(image_base64, VinylData)
+                    if result:
+                        cached.append((image_path, result))
+                        continue
+
+                request = {
+                    # Image names are unique within the images dir
+                    "custom_id": image_path.name,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.model,
+                        "messages": self.identifier.build_messages(image_base64),
+                        "response_format": response_format,
+                    },
+                }
+                line = (json.dumps(request) + "\n").encode()
+
+                if f is None or (
+                    n_requests >= self.max_requests
+                    or n_bytes + len(line) > self.max_bytes
+                ):
+                    if f:
+                        f.close()
+                    jsonl_path = (
+                        self.batch_dir
+                        / f"requests_{int(time.time())}_{len(jsonl_paths)}.jsonl"
+                    )
+                    jsonl_paths.append(jsonl_path)
+                    f = open(jsonl_path, "wb")
+                    n_requests = n_bytes = 0
+
+                f.write(line)
+                n_requests += 1
+                n_bytes += len(line)
+        finally:
+            if f:
+                f.close()
+
+        logger.info(
+            f"Wrote {len(image_paths) - len(cached)} batch requests to "
+            f"{len(jsonl_paths)} files, {len(cached)} images already identified"
+        )
+        return jsonl_paths, cached
+
+    def submit(self, image_paths: list) -> tuple:
+        """
+        Append results for images already in the identification cache, then
+        upload requests for the rest and start a batch per request file.
+        Returns (list of batch ids, number of cached results).
+        """
+        jsonl_paths, cached = self.write_requests(image_paths)
+
+        if cached:
+            self.tracker.add_results_local(cached)
+
+        batch_ids = []
+        for jsonl_path in jsonl_paths:
+            with open(jsonl_path, "rb") as f:
+                input_file = self.client.files.create(file=f, purpose="batch")
+
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            batch_ids.append(batch.id)
+            # Saved as each batch starts so an interrupted submit still resumes them
+            self.save_state(batch_ids, ingested_ids=[])
+
+            logger.info(f"Submitted batch {batch.id} from {jsonl_path.name}")
+
+        logger.info(
+            f"Submitted {len(batch_ids)} batches for "
+            f"{len(image_paths) - len(cached)} images"
+        )
+        return batch_ids, len(cached)
+
+    # ==== COLLECT ==== #
+    def wait(self, batch_id: str, poll_seconds: int = Config.BATCH_POLL_SECONDS):
+        """Poll until the batch reaches a final status."""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            logger.info(
+                f"Batch {batch_id}: {batch.status} "
+                f"({counts.completed}/{counts.total} done, {counts.failed} failed)"
+            )
+
+            if batch.status in FINAL_STATUSES:
+                return batch
+
+            time.sleep(poll_seconds)
+
+    def read_results(self, batch) -> list:
+        """Parse batch output into a list of (image_path, VinylData)."""
+        results = []
+
+        if batch.error_file_id:
+            errors = self.client.files.content(batch.error_file_id).text
+            for line in errors.splitlines():
+                error = json.loads(line)
+                logger.error(f"  ✗ Failed to identify {error['custom_id']}: {error}")
+
+        if not batch.output_file_id:
+            return results
+
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            item = json.loads(line)
+            image_path = self.tracker.images_path / item["custom_id"]
+
+            try:
+                body = item["response"]["body"]
+                content = body["choices"][0]["message"]["content"]
+                results.append((image_path, VinylData.model_validate_json(content)))
+            except Exception as e:
+                logger.error(f"  ✗ Failed to identify {image_path.name}: {e}")
+
+        return results
+
+    def cache_results(self, results: list):
+        """
+        Save identifications to the identification cache so later runs of the
+        same images don't pay again. The cache is keyed on the prepared
+        image, so each image is prepared again here.
+        """
+        if not self.identifier.cache:
+            return
+
+        for image_path, result in results:
+            try:
+                image_base64 = self.identifier.load_image_base64(image_path)
+            except OSError as e:
+                logger.warning(f"Could not cache result for {image_path.name}: {e}")
+                continue
+            self.identifier.cache_result(image_base64, result)
+
+    def ingest(self, batch_ids: list, batch_size: int = Config.SHEET_BATCH_SIZE) -> int:
+        """
+        Wait for each batch, then append its results to the sheet in bulk.
+        Batches are marked ingested one at a time so a resumed run skips them.
+        Returns number of images identified.
+        """
+        state = self.load_state()
+        ingested_ids = [
+            batch_id
+            for batch_id in state.get("ingested_ids", [])
+            if batch_id in batch_ids
+        ]
+        n_results = 0
+
+        for batch_id in batch_ids:
+            if batch_id in ingested_ids:
+                continue
+
+            batch = self.wait(batch_id)
+            results = self.read_results(batch)
+            self.cache_results(results)
+
+            for i in range(0, len(results), batch_size):
+                self.tracker.add_results_local(results[i : i + batch_size])
+
+            ingested_ids.append(batch_id)
+            self.save_state(batch_ids, ingested_ids)
+            logger.info(f"Ingested {len(results)} results from batch {batch_id}")
+            n_results += len(results)
+
+        return n_results
@@ -0,0 +1,200 @@
+"""
+In-process snapshot of the collection for the web app.
+
+Holds parsed albums and pre-rendered JSON so requests don't touch
+google sheets or re-parse tracklists. Rebuilt only when the store changes.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from vinyl_recorder.config import get_logger
+
+logger = get_logger()
+
+
+def parse_album(record: dict) -> dict:
+    """Copy a sheet record with the tracklist JSON string parsed to a list."""
+    album = dict(record)
+    try:
+        album["tracklist"] = json.loads(album.get("tracklist") or "[]")
+    except (TypeError, ValueError):
+        album["tracklist"] = []
+    return album
+
+
+def year_sort_key(album: dict):
+    """Sort by year with missing or non-numeric years last."""
+    try:
+        return (0, int(album.get("album_year")))
+    except (TypeError, ValueError):
+        return (1, 0)
+
+
+# Sort keys accepted by AlbumIndex.query
+SORT_KEYS = {
+    "artist": lambda album: str(album.get("artist") or "").lower(),
+    "album": lambda album: str(album.get("album_title") or "").lower(),
+    "year": year_sort_key,
+}
+
+
+class StaleCursorError(ValueError):
+    """The cursor was issued for a snapshot that has since been rebuilt."""
+
+
+class AlbumIndex:
+    """
+    Presorted orders over a list of albums, so queries are a filter over a
+    presorted list rather than a sort per request.
+    Cursors carry the version the index was built for, so a cursor from an
+    older snapshot is rejected rather than paging into a different list.
+    """
+
+    def __init__(self, albums: list, version: str = ""):
+        self.albums = albums
+        self.version = version
+        self.orders = {
+            sort: sorted(range(len(albums)), key=lambda i: key(albums[i]))
+            for sort, key in SORT_KEYS.items()
+        }
+
+    def query(
+        self,
+        image_names: set = None,
+        sort: str = "artist",
+        cursor: str = None,
+        limit: int = 50,
+        fields: list = None,
+    ) -> dict:
+        """
+        Sort, optionally keep only albums in image_names, and return one page.
+        Pass the returned next_cursor to get the next page.
+        fields limits the keys returned for each album e.g. to omit tracklists.
+        """
+        if sort not in self.orders:
+            raise ValueError(f"sort must be one of {list(self.orders)}")
+
+        start = self.parse_cursor(cursor) if cursor else 0
+
+        matches = self.orders[sort]
+        if image_names is not None:
+            matches = [
+                i for i in matches if self.albums[i].get("image_name") in image_names
+            ]
+
+        page = matches[start : start + limit]
+        next_start = start + limit
+
+        albums = [self.albums[i] for i in page]
+        if fields:
+            albums = [{field: album.get(field) for field in fields} for album in albums]
+
+        return {
+            "albums": albums,
+            "count": len(matches),
+            "next_cursor": (
+                f"{self.version}:{next_start}" if next_start < len(matches) else None
+            ),
+        }
+
+    def parse_cursor(self, cursor: str) -> int:
+        """Offset from a cursor, checking it was issued for this index."""
+        version, sep, offset = cursor.rpartition(":")
+        if not sep or not offset.isdigit():
+            raise ValueError("Invalid cursor")
+        if version != self.version:
+            raise StaleCursorError(
+                "Collection changed, start again from the first page"
+            )
+        return int(offset)
+
+
+class CollectionSnapshot:
+    def __init__(self, sheeter):
+        self.sheeter = sheeter
+        self.lock = threading.Lock()
+
+        self.albums = []
+        self.index = AlbumIndex([])
+        self.json_bytes = b'{"albums": [], "count": 0}'
+        self.content_hash = None
+        self.last_modified = None
+        self.built_version = None
+
+    def refresh(self, sync: bool = False):
+        """
+        Rebuild if the local store has changed since the last build.
+        With sync=True pull the sheet first to pick up changes made elsewhere
+        (e.g. albums added through the telegram bot).
+        """
+        if sync:
+            self.sheeter.sync()
+
+        version = self.sheeter.store.version
+        if version == self.built_version:
+            return
+
+        records = self.sheeter.get_records()
+        albums = sorted(
+            (parse_album(record) for record in records),
+            key=lambda album: str(album.get("artist") or "").lower(),
+        )
+        json_bytes = json.dumps({"albums": albums, "count": len(albums)}).encode(
+            "utf-8"
+        )
+        content_hash = hashlib.sha1(json_bytes).hexdigest()
+        index = AlbumIndex(albums, version=content_hash[:12])
+
+        with self.lock:
+            # A re-sync with no real changes keeps the same validators
+            if content_hash != self.content_hash:
+                self.last_modified = format_datetime(
+                    datetime.now(timezone.utc), usegmt=True
+                )
+                logger.info(f"Collection snapshot rebuilt: {len(albums)} albums")
+
+            self.albums = albums
+            self.index = index
+            self.json_bytes = json_bytes
+            self.content_hash = content_hash
+            self.built_version = version
+
+    def query(self, q: str = None, **kwargs) -> dict:
+        """
+        One page of albums, see AlbumIndex.query. q is matched with the
+        store's full text search, the same as /api/search, so words match
+        as prefixes across artist, titles and tracks with small typos allowed.
+        """
+        with self.lock:
+            index = self.index
+
+        image_names = None
+        if q and q.strip():
+            records = self.sheeter.search(q, limit=max(len(index.albums), 1))
+            image_names = {record.get("image_name") for record in records}
+
+        return index.query(image_names=image_names, **kwargs)
+
+    def etag(self, variant: str) -> str:
+        """ETag for one representation of the snapshot e.g. "html" or "json"."""
+        return f'"{self.content_hash}-{variant}"'
+
+    def is_not_modified(self, headers, variant: str) -> bool:
+        """True if the request's conditional headers match this snapshot."""
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return self.etag(variant) in tags
+
+        return headers.get("if-modified-since") == self.last_modified
+
+    def cache_headers(self, variant: str) -> dict:
+        return {
+            "ETag": self.etag(variant),
+            "Last-Modified": self.last_modified,
+            "Cache-Control": "no-cache",
+        }
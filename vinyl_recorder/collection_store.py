@@ -0,0 +1,295 @@
+"""
+Local SQLite mirror of the google sheet.
+
+All reads are served from here so they don't need a full sheet download.
+GoogleSheeter writes through to the sheet first and then to this store.
+"""
+
+import difflib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from vinyl_recorder.config import get_logger
+
+logger = get_logger()
+
+
+class CollectionStore:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared between the bot's handlers and executor threads
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.create_tables()
+
+        # Bumped on every change, lets callers cache derived data
+        self.version = 0
+        self._df_cache = None
+        self._df_cache_version = -1
+
+    def create_tables(self):
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS rows (
+                    row_num INTEGER PRIMARY KEY,
+                    image_name TEXT,
+                    artist TEXT,
+                    album_title TEXT,
+                    discogs_title TEXT,
+                    data TEXT NOT NULL
+                )
+                """)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_rows_album ON rows (artist, album_title)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_rows_image ON rows (image_name)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+            # Full text search over each row, rowid is the sheet row number
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+                    artist, album_title, discogs_title, tracklist,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+                """)
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_terms USING fts5vocab(search, row)"
+            )
+
+    # ==== SYNC ==== #
+    @property
+    def last_synced(self) -> float:
+        """Unix time of the last full sync from the sheet (0 if never)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'last_synced'"
+            ).fetchone()
+        return float(row[0]) if row else 0.0
+
+    def is_stale(self, max_age_seconds: int) -> bool:
+        return time.time() - self.last_synced > max_age_seconds
+
+    def replace_all(self, records: list):
+        """
+        Replace store contents with a full download of the sheet.
+        records is the output of gspread get_all_records().
+        """
+        rows = [
+            self._to_db_row(row_num, record)
+            for row_num, record in enumerate(records, start=2)  # +1 header, +1 index
+        ]
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('last_synced', ?)",
+                (str(time.time()),),
+            )
+
+            # Nothing changed in the sheet, keep version so cached data stays valid
+            existing = self.conn.execute(
+                "SELECT row_num, data FROM rows ORDER BY row_num"
+            ).fetchall()
+            if existing == [(row[0], row[-1]) for row in rows]:
+                logger.info(f"Synced {len(rows)} rows, no changes")
+                return
+
+            self.conn.execute("DELETE FROM rows")
+            self.conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("DELETE FROM search")
+            self.conn.executemany(
+                "INSERT INTO search (rowid, artist, album_title, discogs_title, tracklist) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    self._to_search_row(row_num, record)
+                    for row_num, record in enumerate(records, start=2)
+                ],
+            )
+            self.version += 1
+
+        logger.info(f"Synced {len(rows)} rows into local store")
+
+    # ==== WRITES ==== #
+    def insert_row(self, row_num: int, record: dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?, ?)",
+                self._to_db_row(row_num, record),
+            )
+            self._index_row(row_num, record)
+            self.version += 1
+
+    def update_row(self, row_num: int, updates: dict):
+        """Merge {column_name: value} into an existing row."""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT data FROM rows WHERE row_num = ?", (row_num,)
+            ).fetchone()
+
+            if row is None:
+                logger.warning(f"Row {row_num} not in local store, skipping update")
+                return
+
+            record = json.loads(row[0])
+            record.update(updates)
+            self.conn.execute(
+                "REPLACE INTO rows VALUES (?, ?, ?, ?, ?, ?)",
+                self._to_db_row(row_num, record),
+            )
+            self._index_row(row_num, record)
+            self.version += 1
+
+    # ==== READS ==== #
+    def next_row_num(self) -> int:
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(row_num) FROM rows").fetchone()
+        return (row[0] or 1) + 1
+
+    def is_duplicate(self, artist: str, album_title: str) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM rows WHERE artist = ? AND album_title = ? LIMIT 1",
+                (artist, album_title),
+            ).fetchone()
+        return row is not None
+
+    def find_row_by_image_name(self, image_name: str) -> int:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT row_num FROM rows WHERE image_name = ? LIMIT 1",
+                (image_name,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def image_name_at(self, row_num: int) -> str:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT image_name FROM rows WHERE row_num = ?", (row_num,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_existing_values(self, column_name: str) -> set:
+        values = set()
+        for record in self.iter_records():
+            value = record.get(column_name)
+            if value is not None:
+                values.add(value)
+        return values
+
+    def rows_needing_enrichment(self) -> list:
+        """(row_num, record) for every row with an empty discogs_title."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT row_num, data FROM rows "
+                "WHERE discogs_title IS NULL OR discogs_title = '' "
+                "ORDER BY row_num"
+            ).fetchall()
+        return [(row_num, json.loads(data)) for row_num, data in rows]
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """
+        Full text search over artist, titles and tracklist. Every word must
+        match as a prefix; words with no matches are swapped for the closest
+        indexed terms so small typos still find results.
+        Returns records ordered by relevance.
+        """
+        terms = re.findall(r"\w+", query.lower())
+        if not terms:
+            return []
+
+        with self.lock:
+            clauses = []
+            for term in terms:
+                alternatives = [f'"{term}"*']
+                if not self._has_prefix(term):
+                    alternatives += [f'"{close}"' for close in self._close_terms(term)]
+                clauses.append("(" + " OR ".join(alternatives) + ")")
+
+            rows = self.conn.execute(
+                "SELECT rows.data FROM search JOIN rows ON rows.row_num = search.rowid "
+                "WHERE search MATCH ? ORDER BY search.rank LIMIT ?",
+                (" AND ".join(clauses), limit),
+            ).fetchall()
+
+        return [json.loads(data) for (data,) in rows]
+
+    def _has_prefix(self, term: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM search_terms WHERE term >= ? AND term < ? LIMIT 1",
+            (term, term + "\uffff"),
+        ).fetchone()
+        return row is not None
+
+    def _close_terms(self, term: str) -> list:
+        vocabulary = [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT term FROM search_terms WHERE length(term) BETWEEN ? AND ?",
+                (len(term) - 2, len(term) + 2),
+            )
+        ]
+        return difflib.get_close_matches(term, vocabulary, n=3, cutoff=0.75)
+
+    def iter_records(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT data FROM rows ORDER BY row_num"
+            ).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def to_df(self) -> pd.DataFrame:
+        """All rows as a DataFrame, cached until the store next changes."""
+        if self._df_cache_version != self.version:
+            self._df_cache = pd.DataFrame(list(self.iter_records()))
+            self._df_cache_version = self.version
+        return self._df_cache
+
+    def _to_db_row(self, row_num: int, record: dict) -> tuple:
+        return (
+            row_num,
+            self._as_text(record.get("image_name")),
+            self._as_text(record.get("artist")),
+            self._as_text(record.get("album_title")),
+            self._as_text(record.get("discogs_title")),
+            json.dumps(record),
+        )
+
+    def _index_row(self, row_num: int, record: dict):
+        self.conn.execute("DELETE FROM search WHERE rowid = ?", (row_num,))
+        self.conn.execute(
+            "INSERT INTO search (rowid, artist, album_title, discogs_title, tracklist) "
+            "VALUES (?, ?, ?, ?, ?)",
+            self._to_search_row(row_num, record),
+        )
+
+    def _to_search_row(self, row_num: int, record: dict) -> tuple:
+        tracklist = record.get("tracklist") or ""
+        try:
+            tracklist = " ".join(json.loads(tracklist))
+        except (TypeError, ValueError):
+            pass
+
+        return (
+            row_num,
+            self._as_text(record.get("artist")),
+            self._as_text(record.get("album_title")),
+            self._as_text(record.get("discogs_title")),
+            str(tracklist),
+        )
+
+    @staticmethod
+    def _as_text(value):
+        # Sheets returns numbers for numeric looking cells e.g. album titles like "1989"
+        return None if value is None else str(value)
@@ -1,11 +1,14 @@
+import threading
+import time
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
-from vinyl_recorder.config import get_logger
+from vinyl_recorder.config import Config, get_logger
 from vinyl_recorder.vinyl_cover_identifier import VinylIdentifier
 from vinyl_recorder.vinyl_cover_identifier import VinylData
 from vinyl_recorder.ghseets import GoogleSheeter
+from vinyl_recorder.image_manifest import ImageManifest
 
 logger = get_logger()
 
@@ -27,50 +30,87 @@ class CollectionTracker:
         self,
         sheeter,
         images_path: str = None,
-        image_type: str = "jpg",
+        image_types: tuple = Config.IMAGE_TYPES,
         source: str = "local",
+        manifest: ImageManifest = None,
+        batch_size: int = Config.SHEET_BATCH_SIZE,
+        flush_seconds: float = Config.SHEET_FLUSH_SECONDS,
     ):
         self.images_path = Path(images_path) if images_path else None
-        self.image_type = image_type
+        self.image_types = image_types
         self.source = source
         self.sheeter = sheeter
+        self.manifest = manifest
+        if self.manifest is None and self.images_path:
+            self.manifest = ImageManifest(self.images_path)
+
+        # Rows waiting to be appended, flushed by size or age
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.lock = threading.RLock()
+        self.buffer = []
+        self.buffered_at = None
+        # Called with the image names of each flushed batch
+        self.on_flush = None
+
+        # {(artist, album_title)} in the sheet and buffer, rebuilt if the store changes
+        self._albums = set()
+        self._albums_version = None
 
     def get_image_list(self) -> list:
         """
         Get list of full path to all images in the supplied dir images_path.
         """
-        images = self.images_path.glob(pattern=f"*.{self.image_type}")
-        images = [image for image in images]
-        return images
+        return [self.images_path / name for name in sorted(self.scan_images())]
+
+    def scan_images(self) -> dict:
+        """{image name: content hash} for every image in images_path."""
+        return self.manifest.scan(self.image_types)
 
     def load_tracker_sheet(self) -> pd.DataFrame:
-        df_tracker = self.sheeter.load_sheet_as_df()
+        df_tracker = self.sheeter.refresh_df()
         return df_tracker
 
     def get_pending_images(self) -> list:
         """
-        Compare tracker sheet with full list of images and
-        return only those that have not been processed.
+        Compare image names in the tracker sheet with the images dir and
+        return only those that have not been processed. Copies of an
+        already processed image (same content, different name) are skipped.
         """
-        df_processed = self.load_tracker_sheet()
-        all_images = self.get_image_list()
-        all_image_names = [str(image.name) for image in all_images]
+        self.sheeter.sync_if_stale()
+        processed = {
+            str(name) for name in self.sheeter.get_existing_values("image_name")
+        }
+        images = self.scan_images()
+
+        seen_hashes = {images[name] for name in processed if name in images}
+        pending = []
+        n_copies = 0
 
-        if df_processed.empty:
-            pending = all_images
-        else:
-            images_got = df_processed["image_name"].unique()
-            pending = [
-                Path(self.images_path, p)
-                for p in all_image_names
-                if p not in images_got
-            ]
+        for name in sorted(images):
+            if name in processed:
+                continue
+            if images[name] in seen_hashes:
+                n_copies += 1
+                continue
+            seen_hashes.add(images[name])
+            pending.append(self.images_path / name)
+
+        if n_copies:
+            logger.info(f"Skipped {n_copies} images that are copies of others")
 
         return pending
 
-    def add_result_local(self, image_path, result: VinylData):
+    def build_row(
+        self,
+        image_name: str,
+        source: str,
+        result: VinylData,
+        discogs_updates: dict = None,
+    ) -> list:
         """
-        Add results to google sheet. Column headers (in order):
+        Build one sheet row from an identification result, with the Discogs
+        columns filled if discogs_updates is given. Column headers (in order):
             1. image_name
             2. process_date
             3. source
@@ -83,58 +123,210 @@ class CollectionTracker:
             10. image_url
             11. tracklist
         """
-
-        image_name = image_path.name
         process_date = datetime.now().isoformat(timespec="seconds")
-        source = self.source
-        success = result.success
-        artist = result.artist
-        album_title = result.album_title
-        album_year = result.album_year
-        confidence = result.confidence
+        discogs_updates = discogs_updates or {}
 
         new_row = [
             image_name,
             process_date,
             source,
-            success,
-            artist,
-            album_title,
-            album_year,
-            confidence,
-            "",  # discogs_title - filled during enrichment
-            "",  # image_url - filled during enrichment
-            "",  # tracklist - filled during enrichment
+            result.success,
+            result.artist,
+            result.album_title,
+            result.album_year,
+            result.confidence,
+            # Filled during enrichment if not already known
+            discogs_updates.get("discogs_title", ""),
+            discogs_updates.get("image_url", ""),
+            discogs_updates.get("tracklist", ""),
         ]
 
+        return new_row
+
+    # ==== BUFFERED WRITES ==== #
+    @staticmethod
+    def album_key(artist, album_title) -> tuple:
+        # Same text form as the local store, sheets returns numbers for e.g. "1989"
+        return (
+            None if artist is None else str(artist),
+            None if album_title is None else str(album_title),
+        )
+
+    def owned_albums(self) -> set:
+        """(artist, album_title) of every row in the sheet or waiting to be appended."""
+        with self.lock:
+            self.sheeter.sync_if_stale()
+            version = self.sheeter.store.version
+            if version != self._albums_version:
+                self._albums = {
+                    self.album_key(record.get("artist"), record.get("album_title"))
+                    for record in self.sheeter.store.iter_records()
+                }
+                self._albums.update(
+                    self.album_key(row[4], row[5]) for row in self.buffer if row[3]
+                )
+                self._albums_version = version
+            return self._albums
+
+    def is_duplicate(self, artist: str, album_title: str) -> bool:
+        return self.album_key(artist, album_title) in self.owned_albums()
+
+    def add_result(
+        self,
+        image_name: str,
+        source: str,
+        result: VinylData,
+        check_duplicate: bool = True,
+        discogs_updates: dict = None,
+    ) -> bool:
+        """
+        Buffer a result for appending. Appends the buffer once it holds
+        batch_size rows or its oldest row is flush_seconds old.
+        Returns False if skipped as a duplicate.
+        """
+        with self.lock:
+            # Unidentified images have no artist/album so never count as duplicates
+            if (
+                check_duplicate
+                and result.success
+                and self.is_duplicate(result.artist, result.album_title)
+            ):
+                logger.warning(
+                    f"Already got data for {result.artist} - {result.album_title}"
+                )
+                return False
+
+            self.buffer.append(
+                self.build_row(image_name, source, result, discogs_updates)
+            )
+            if result.success:
+                self.owned_albums().add(
+                    self.album_key(result.artist, result.album_title)
+                )
+            if self.buffered_at is None:
+                self.buffered_at = time.monotonic()
+
+            self.flush_if_due()
+
+        return True
+
+    def flush_if_due(self) -> list:
+        with self.lock:
+            if len(self.buffer) >= self.batch_size or (
+                self.buffered_at is not None
+                and time.monotonic() - self.buffered_at >= self.flush_seconds
+            ):
+                return self.flush()
+        return []
+
+    def flush(self) -> list:
+        """Append all buffered rows with one request. Returns their image names."""
+        with self.lock:
+            if not self.buffer:
+                return []
+
+            self.sheeter.append_rows(self.buffer)
+            image_names = [row[0] for row in self.buffer]
+            self.buffer = []
+            self.buffered_at = None
+            # Our own rows are already in the index, no need to rebuild it
+            self._albums_version = self.sheeter.store.version
+
+        if self.on_flush:
+            self.on_flush(image_names)
+
+        return image_names
+
+    def add_result_local(self, image_path, result: VinylData) -> bool:
+        """
+        Add results to google sheet. Only buffered: the row is appended once
+        the buffer is full or old enough, so the caller must call flush()
+        when done or rows still buffered are lost on exit.
+        Returns False if skipped as a duplicate.
+        """
         # There can be duplicated if albums were added from telegram
         # before local because the image name from telegram is
         # not different and not in the list of images here.
-        if self.sheeter.is_duplicate(artist, album_title):
-            logger.warning(f"Already got data for {artist} - {album_title}")
-            return
+        return self.add_result(image_path.name, self.source, result)
 
-        self.sheeter.append_row(row_data=new_row)
+    def add_results_local(self, results: list) -> list:
+        """
+        Add a batch of (image_path, result) to google sheet and flush.
+        Duplicates already in the sheet or earlier in the batch are skipped.
+        Returns the image names appended.
+        """
+        added = [
+            image_path.name
+            for image_path, result in results
+            if self.add_result_local(image_path, result)
+        ]
+        self.flush()
 
-    def add_result_telegram(self, image_name: str, result: VinylData):
-        """Add result from Telegram (no full_path)."""
-        date_now = datetime.now().isoformat(timespec="seconds")
+        return added
 
-        new_row = [
-            image_name,
-            date_now,
-            "telegram",  # source
-            result.success,
-            result.artist,
-            result.album_title,
-            result.album_year,
-            result.confidence,
-            "",  # discogs_title
-            "",  # image_url
-            "",  # tracklist
-        ]
+    def add_result_telegram(
+        self, image_name: str, result: VinylData, discogs_updates: dict = None
+    ) -> int:
+        """
+        Add result from Telegram (no full_path), with its Discogs columns if
+        already looked up, so the row is complete in one write. Written
+        straight away rather than buffered. The bot has already asked about
+        duplicates, so they aren't skipped here. Returns the row number.
+        """
+        appended = self.append_now(
+            [(image_name, result, discogs_updates)], check_duplicate=False
+        )
+        return appended.get(image_name)
+
+    def add_results_telegram(self, items: list) -> dict:
+        """
+        Add many (image_name, result, discogs_updates) from Telegram with a
+        single append. Albums already in the sheet, or earlier in items, are
+        skipped. Returns {image name: row number} of the rows appended.
+        """
+        return self.append_now(items)
+
+    def append_now(self, items: list, check_duplicate: bool = True) -> dict:
+        """
+        Append (image_name, result, discogs_updates) from Telegram in one
+        request, bypassing the shared buffer so a failed append can't leave
+        rows behind for a later flush. Albums only count as owned once the
+        append succeeds, so a retry after an error isn't taken as a duplicate.
+        Returns {image name: row number} of the rows appended.
+        """
+        with self.lock:
+            rows = []
+            albums = set()
+
+            for image_name, result, discogs_updates in items:
+                key = self.album_key(result.artist, result.album_title)
+                if (
+                    check_duplicate
+                    and result.success
+                    and (key in albums or self.is_duplicate(*key))
+                ):
+                    logger.warning(
+                        f"Already got data for {result.artist} - {result.album_title}"
+                    )
+                    continue
+
+                rows.append(
+                    self.build_row(image_name, "telegram", result, discogs_updates)
+                )
+                if result.success:
+                    albums.add(key)
+
+            if not rows:
+                return {}
+
+            row_nums = self.sheeter.append_rows(rows)
+            self.owned_albums().update(albums)
+            appended = dict(zip((row[0] for row in rows), row_nums))
+
+        if self.on_flush:
+            self.on_flush(list(appended))
 
-        self.sheeter.append_row(row_data=new_row)
+        return appended
 
 
 if __name__ == "__main__":
@@ -163,7 +355,11 @@ if __name__ == "__main__":
     if len(pending_list) == 0:
         logger.info("No images left to identify")
 
-    for image_path in pending_list:
-        result = identifier.identify_image(image_path)
-        print(result.model_dump_json(indent=2))
-        tracker.add_result_local(image_path, result)
+    try:
+        for image_path in pending_list:
+            result = identifier.identify_image(image_path)
+            print(result.model_dump_json(indent=2))
+            tracker.add_result_local(image_path, result)
+    finally:
+        # Write out anything still buffered
+        tracker.flush()
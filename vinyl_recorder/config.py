@@ -17,25 +17,104 @@ class Config:
     # LOCAL IMAGE DIRS
     IMAGES_DIR_PROD = LOCAL_WD / "data/all_images"
     IMAGES_DIR_TEST = LOCAL_WD / "data/test_images"
+    # Extensions picked up from the images dir (HEIC needs pillow-heif installed)
+    IMAGE_TYPES = ("jpg", "jpeg", "png", "heic")
+
+    # LOCAL CACHE DIR
+    CACHE_DIR = LOCAL_WD / "data/cache"
 
     # LLM OPENAI
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL = "gpt-4o"
+    # Leave unset for api.openai.com, or point at a local stub server for testing
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+    # Seconds between status checks while waiting on a Batch API job
+    BATCH_POLL_SECONDS = 60
+    # Requests and bytes per Batch API input file (API limits are 50,000 and 200MB)
+    BATCH_MAX_REQUESTS = 50_000
+    BATCH_MAX_BYTES = 190 * 1024 * 1024
+    # Albums beyond this many prompt tokens are summarised for recommendations
+    RECOMMENDER_MAX_CONTEXT_TOKENS = 8000
+    # Precomputed recommendations: refill a distance's pool below this size
+    RECOMMEND_POOL_LOW_WATER = 10
+    RECOMMEND_POOL_CHECK_SECONDS = 30
+    # Pools are regenerated once owned albums have stopped changing for this long
+    RECOMMEND_POOL_SETTLE_SECONDS = 5 * 60
+    # Recently served recommendations sent with each refill to avoid repeats
+    RECOMMEND_POOL_EXCLUDE_MAX = 50
+    # Ask for extra albums to cover owned ones the model repeats, and how
+    # many follow up calls may top up a result that's still short
+    RECOMMEND_OVERGENERATE = 1.5
+    RECOMMEND_MAX_TOPUPS = 2
+    # Fuzzy album title similarity (0-1) that counts as already owned
+    OWNED_MATCH_CUTOFF = 0.9
+    # Embedding recommender: model and JSONL catalogue of albums to suggest from
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    CANDIDATE_CATALOGUE = LOCAL_WD / "data/candidate_albums.jsonl"
+    # Max LLM requests in flight per process, shared by sync and async calls,
+    # and retries on 429/5xx
+    LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+    LLM_MAX_RETRIES = 4
+    # Concurrent identification requests in bulk runs
+    BULK_WORKERS = int(os.getenv("BULK_WORKERS", 4))
+    # Watch mode: quiet period before new images are processed, and rescan interval
+    WATCH_DEBOUNCE_SECONDS = 2
+    WATCH_POLL_SECONDS = 5
+    # Vision detail level sent with images: "low", "high" or "auto"
+    OPENAI_IMAGE_DETAIL = os.getenv("OPENAI_IMAGE_DETAIL", "auto")
+
+    # IMAGE PREPROCESSING
+    IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", 1024))
+    IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 85))
+
+    # IDENTIFICATION CACHE
+    ID_CACHE_TTL_SECONDS = 90 * 24 * 60 * 60
+    ID_CACHE_MAX_ENTRIES = 5000
+    # Also match near duplicate photos by perceptual hash (bits that may differ)
+    ID_CACHE_PERCEPTUAL = os.getenv("ID_CACHE_PERCEPTUAL", "false").lower() == "true"
+    ID_CACHE_MAX_DISTANCE = 5
 
     # TELEGRAM
     BOT_TOKEN = os.getenv("BOT_TOKEN")
     BOT_TOKEN_TEST = os.getenv("BOT_TOKEN_TEST")
+    # Updates handled at once, and threads for blocking sheets/LLM/discogs calls
+    BOT_CONCURRENT_UPDATES = 16
+    BOT_WORKERS = 8
+    # Unconfirmed photos: dropped after this long, or oldest first past these limits
+    PENDING_TTL_SECONDS = 15 * 60
+    PENDING_MAX_BYTES = 64 * 1024 * 1024
+    PENDING_MAX_ENTRIES = 500
+    PENDING_SWEEP_SECONDS = 60
+    # Photos from one user this close together are handled as one batch
+    BOT_PHOTO_BATCH_SECONDS = 1.5
 
     # DISCOGS
     DISCOGS_API_KEY = os.getenv("DISCOGS_API_KEY")
+    # Authenticated limit is 60/min, leave a little headroom
+    DISCOGS_REQUESTS_PER_MINUTE = 55
+    DISCOGS_MAX_RETRIES = 5
+    # Concurrent lookups in bulk enrichment, all sharing the rate limit above
+    DISCOGS_WORKERS = 4
+    DISCOGS_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+    DISCOGS_NEGATIVE_TTL_SECONDS = 24 * 60 * 60
 
     # GOOGLE SHEETS
     GOOGLE_SERVICE_ACCOUNT = os.getenv("GOOGLE_SERVICE_ACCOUNT")
     VINYL_SHEET_TEST = os.getenv("VINYL_SHEET_TEST")
     VINYL_SHEET_PROD = os.getenv("VINYL_SHEET_PROD")
+    # Seconds before the local store re-syncs from the sheet to pick up manual edits
+    SHEET_SYNC_SECONDS = int(os.getenv("SHEET_SYNC_SECONDS", 300))
+    # Rows written per batch_update request
+    SHEET_BATCH_SIZE = 50
+    # Buffered local results are appended once this old, even if the batch isn't full
+    SHEET_FLUSH_SECONDS = 10
 
     # WEB APP
     WEB_APP_LINK = os.getenv("WEB_APP_LINK")
+    # Seconds between background re-syncs of the web app's collection snapshot
+    SNAPSHOT_REFRESH_SECONDS = int(os.getenv("SNAPSHOT_REFRESH_SECONDS", 60))
+    # Albums per page on the web app and /api/albums
+    WEB_PAGE_SIZE = 60
 
     @classmethod
     def vinyl_sheet_id(cls) -> str:
@@ -61,6 +140,11 @@ class Config:
         if cls.APP_ENV == "test":
             return cls.IMAGES_DIR_TEST
 
+    @classmethod
+    def cache_path(cls, name: str):
+        """Path for a local cache file, kept separate per APP_ENV."""
+        return cls.CACHE_DIR / f"{name}_{cls.APP_ENV}.sqlite"
+
 
 def get_logger(name: str = __name__) -> logging.Logger:
     """
@@ -1,9 +1,16 @@
 import discogs_client
 import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from discogs_client.utils import update_qs
 from pydantic import BaseModel
 from typing import Optional
 from vinyl_recorder.config import Config, get_logger
 from vinyl_recorder.ghseets import GoogleSheeter
+from vinyl_recorder.discogs_cache import DiscogsCache, NOT_FOUND
+from vinyl_recorder.rate_limiter import TokenBucket
 
 logger = get_logger()
 TOKEN = Config.DISCOGS_API_KEY
@@ -16,100 +23,253 @@ class DiscogsData(BaseModel):
     image_url: str
 
 
+# ==== RATE LIMITING ==== #
+class RateLimitedFetcher:
+    """
+    Wraps the discogs_client fetcher so every HTTP request (including the
+    client's lazy fetches) waits for a token. Reads the X-Discogs-Ratelimit-Remaining
+    header after each response and retries 429s with backoff.
+    """
+
+    def __init__(self, fetcher, bucket: TokenBucket, max_retries: int):
+        self.fetcher = fetcher
+        self.bucket = bucket
+        self.max_retries = max_retries
+
+        # We do our own retries, turn off the client's built in backoff
+        self.fetcher.backoff_enabled = False
+
+    @property
+    def backoff_enabled(self) -> bool:
+        return False
+
+    def fetch(self, client, method, url, data=None, headers=None, json=True):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            content, status_code = self.fetcher.fetch(
+                client, method, url, data=data, headers=headers
+            )
+
+            remaining = getattr(self.fetcher, "rate_limit_remaining", None)
+            if remaining is not None:
+                self.bucket.limit_remaining(int(remaining))
+
+            if status_code != 429:
+                break
+
+            wait = 2**attempt
+            logger.warning(f"Discogs rate limited, retrying in {wait}s")
+            time.sleep(wait)
+
+        return content, status_code
+
+
 class DiscogEnricher:
-    def __init__(self, sheeter):
+    def __init__(self, sheeter, use_cache: bool = True):
         self.d = discogs_client.Client("vinyl_recorder/1.0", user_token=TOKEN)
+        self.d._fetcher = RateLimitedFetcher(
+            self.d._fetcher,
+            bucket=TokenBucket(Config.DISCOGS_REQUESTS_PER_MINUTE),
+            max_retries=Config.DISCOGS_MAX_RETRIES,
+        )
         self.sheeter = sheeter
+        self.cache = DiscogsCache() if use_cache else None
+
+        # Request instrumentation
+        self.stats_lock = threading.Lock()
+        self.request_counts = Counter()
+        self.request_seconds = Counter()
 
     def search_discogs(self, artist: str, album: str) -> Optional[DiscogsData]:
         """
-        Search discogs db for album data.
+        Search discogs db for album data, using the local cache if possible.
         Returns None if not found.
         """
+        if self.cache:
+            cached = self.cache.get(artist, album)
+            if cached is NOT_FOUND:
+                logger.info(f"Cached as not on Discogs: {artist} - {album}")
+                return None
+            if cached:
+                return DiscogsData.model_validate_json(cached)
+
         try:
-            query = f"{artist} {album}"
-            results = self.d.search(query, type="release")
+            discogs_data = self.fetch_discogs(artist, album)
+        except Exception as e:
+            # Not cached, so the lookup is tried again next time
+            logger.error(f"Error searching Discogs for {artist} - {album}: {e}")
+            return None
 
-            # Check if any results
-            if not results or results.count == 0:
-                logger.warning(f"No Discogs results for: {artist} - {album}")
-                return None
+        if self.cache:
+            self.cache.put(
+                artist, album, discogs_data.model_dump_json() if discogs_data else None
+            )
 
-            page1 = results.page(1)
-            item = page1[0]
+        return discogs_data
 
-            title = item.title
+    def fetch_discogs(self, artist: str, album: str) -> Optional[DiscogsData]:
+        """
+        Search discogs api for album data.
+        Makes exactly two requests: one search page with a single result,
+        then the full release for its tracklist and images.
+        Returns None if not found, raises on request errors.
+        """
+        search_url = update_qs(
+            f"{self.d._base_url}/database/search",
+            {"q": f"{artist} {album}", "type": "release", "per_page": 1},
+        )
+        results = self.timed_get("search", search_url).get("results", [])
 
-            # Get tracklist
-            tracklist = []
-            if hasattr(item, "tracklist") and item.tracklist:
-                tracklist = [
-                    f"{track.position} {track.title}" for track in item.tracklist
-                ]
+        if not results:
+            logger.warning(f"No Discogs results for: {artist} - {album}")
+            return None
 
-            # Get image URL
-            image_url = ""
-            if hasattr(item, "images") and item.images:
-                image_url = item.images[0].get("uri150", "")
+        item = results[0]
+        title = item["title"]
 
-            if not image_url:
-                logger.warning(f"No image found for: {artist} - {album}")
+        release = self.timed_get("release", f"{self.d._base_url}/releases/{item['id']}")
 
-            return DiscogsData(
-                discogs_title=title,
-                tracklist=tracklist,
-                image_url=image_url,
-            )
+        # Get tracklist
+        tracklist = [
+            f"{track.get('position', '')} {track.get('title', '')}"
+            for track in release.get("tracklist") or []
+        ]
 
-        except IndexError as e:
-            logger.error(f"Index error searching Discogs for {artist} - {album}: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error searching Discogs for {artist} - {album}: {e}")
-            return None
+        # Get image URL
+        image_url = ""
+        if release.get("images"):
+            image_url = release["images"][0].get("uri150", "")
+
+        if not image_url:
+            logger.warning(f"No image found for: {artist} - {album}")
+
+        return DiscogsData(
+            discogs_title=title,
+            tracklist=tracklist,
+            image_url=image_url,
+        )
+
+    def timed_get(self, request_type: str, url: str) -> dict:
+        """GET a discogs api url, recording count and time per request type."""
+        start = time.monotonic()
+        try:
+            return self.d._get(url)
+        finally:
+            elapsed = time.monotonic() - start
+            with self.stats_lock:
+                self.request_counts[request_type] += 1
+                self.request_seconds[request_type] += elapsed
+            logger.debug(f"Discogs {request_type} request took {elapsed:.2f}s")
+
+    @property
+    def stats(self) -> str:
+        return ", ".join(
+            f"{request_type}: {count} requests, {self.request_seconds[request_type]:.1f}s"
+            for request_type, count in self.request_counts.items()
+        )
+
+    def to_row_updates(self, discogs_data: DiscogsData) -> dict:
+        """Sheet cell updates {column_name: value} for one enriched row."""
+        return {
+            "discogs_title": discogs_data.discogs_title,
+            "image_url": discogs_data.image_url,
+            # Convert tracklist to JSON string for storage
+            "tracklist": json.dumps(discogs_data.tracklist),
+        }
 
     def enrich_row(self, row_num: int, artist: str, album: str):
         """
         Search Discogs for one row and update the sheet.
         """
+        row_updates = self.lookup_row(row_num, artist, album)
+
+        if row_updates:
+            self.sheeter.update_row_cells(row_num, row_updates)
+            return True
+
+        return False
+
+    def lookup_row(self, row_num: int, artist: str, album: str) -> Optional[dict]:
+        """
+        Search Discogs for one row and return its cell updates
+        (None if not found).
+        """
         logger.info(f"Enriching row {row_num}: {artist} - {album}")
 
         discogs_data = self.search_discogs(artist, album)
 
         if discogs_data:
-            # Convert tracklist to JSON string for storage
-            tracklist_json = json.dumps(discogs_data.tracklist)
-
-            # Update the row
-            self.sheeter.update_row_cells(
-                row_num,
-                {
-                    "discogs_title": discogs_data.discogs_title,
-                    "image_url": discogs_data.image_url,
-                    "tracklist": tracklist_json,
-                },
-            )
-
             logger.info(f"✓ Enriched: {artist} - {album}")
-            return True
+            return self.to_row_updates(discogs_data)
         else:
             logger.warning(f"✗ Could not enrich: {artist} - {album}")
-            return False
+            return None
 
-    def enrich_all_pending(self):
+    def write_updates(self, row_updates: dict, image_names: dict, journal=None):
+        """Write a batch of row updates, then mark them written in the journal."""
+        self.sheeter.update_rows_cells(row_updates)
+        if journal:
+            journal.record_enrichments_written(list(image_names.values()))
+
+    def enrich_all_pending(
+        self,
+        batch_size: int = Config.SHEET_BATCH_SIZE,
+        workers: int = Config.DISCOGS_WORKERS,
+        journal=None,
+    ):
         """
         Enrich all rows that are missing Discogs data.
+        Lookups run on `workers` threads sharing the rate limit, and
+        sheet updates are written in batches of batch_size rows.
+        With a RunJournal, found updates are journaled before they're written
+        and marked once written, and ones from an interrupted run are written
+        without a lookup.
         """
 
         logger.info("Starting enrichment process...")
 
-        for row_num, row_data in self.sheeter.iterate_rows_needing_enrichment():
-            artist = row_data.get("artist")
-            album = row_data.get("album_title")
+        pending_updates = {}
+        pending_images = {}  # {row_num: image_name} for marking in the journal
+        n_from_journal = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for row_num, row_data in self.sheeter.iterate_rows_needing_enrichment():
+                image_name = str(row_data.get("image_name"))
+
+                if journal and journal.enrichment(image_name):
+                    pending_updates[row_num] = journal.enrichment(image_name)
+                    pending_images[row_num] = image_name
+                    n_from_journal += 1
+                    continue
+
+                future = executor.submit(
+                    self.lookup_row,
+                    row_num,
+                    row_data.get("artist"),
+                    row_data.get("album_title"),
+                )
+                futures[future] = (row_num, image_name)
+
+            for future in as_completed(futures):
+                row_num, image_name = futures[future]
+                row_updates = future.result()
+                if row_updates:
+                    if journal:
+                        journal.record_enriched(image_name, row_updates)
+                    pending_updates[row_num] = row_updates
+                    pending_images[row_num] = image_name
+
+                if len(pending_updates) >= batch_size:
+                    self.write_updates(pending_updates, pending_images, journal)
+                    pending_updates = {}
+                    pending_images = {}
 
-            self.enrich_row(row_num, artist, album)
+        self.write_updates(pending_updates, pending_images, journal)
 
-        logger.info("Enrichment complete")
+        if n_from_journal:
+            logger.info(f"Wrote {n_from_journal} enrichments saved by an earlier run")
+        logger.info(f"Enrichment complete ({self.stats or 'no requests'})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+"""
+Persistent cache of Discogs lookups keyed by normalised artist/album.
+
+Albums not found on Discogs are cached too, with a shorter TTL, so
+repeat enrichment runs don't search for them again every time.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+
+from vinyl_recorder.config import Config, get_logger
+
+logger = get_logger()
+
+# Returned by get() for a cached "not found", to tell it apart from a cache miss
+NOT_FOUND = object()
+
+
+def normalise_key(artist: str, album: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    parts = []
+    for value in (artist, album):
+        value = re.sub(r"[^\w\s]", " ", str(value or "").lower())
+        parts.append(" ".join(value.split()))
+    return "|".join(parts)
+
+
+class DiscogsCache:
+    def __init__(
+        self,
+        db_path=None,
+        ttl_seconds: int = Config.DISCOGS_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: int = Config.DISCOGS_NEGATIVE_TTL_SECONDS,
+    ):
+        db_path = db_path or Config.cache_path("discogs_cache")
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS lookups (
+                    key TEXT PRIMARY KEY,
+                    data TEXT,
+                    expires REAL NOT NULL
+                )
+                """)
+
+    def get(self, artist: str, album: str):
+        """
+        Cached DiscogsData JSON for this album, NOT_FOUND if it's
+        cached as missing from Discogs, or None on a cache miss.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data FROM lookups WHERE key = ? AND expires > ?",
+                (normalise_key(artist, album), time.time()),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return NOT_FOUND if row[0] is None else row[0]
+
+    def put(self, artist: str, album: str, data_json: str):
+        """Cache a lookup result. Pass data_json=None for not found."""
+        ttl = self.ttl_seconds if data_json else self.negative_ttl_seconds
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?)",
+                (normalise_key(artist, album), data_json, time.time() + ttl),
+            )
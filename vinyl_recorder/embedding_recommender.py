@@ -0,0 +1,355 @@
+"""
+Local album recommender using embeddings instead of a full LLM call.
+
+Owned albums and a catalogue of candidate albums are embedded once (vectors
+are cached on disk). Candidates are scored by cosine similarity to their
+nearest owned album, and taste_distance picks a band of that ranking.
+An LLM can optionally re-rank a short list.
+
+Albums are embedded from their title and tracklist, the sheet doesn't hold
+genres, so candidates are embedded the same way to stay comparable.
+
+Candidate catalogue is a JSONL file, one album per line:
+    {"artist": "...", "album": "...", "tracklist": ["..."]}
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from vinyl_recorder.album_recommender import RecommendedAlbum, RecommendedAlbums
+from vinyl_recorder.config import Config, get_logger
+from vinyl_recorder.ghseets import GoogleSheeter
+from vinyl_recorder.llm_client import get_llm_client, shared_openai_clients
+from vinyl_recorder.ownership_index import OwnershipIndex, normalise_name
+
+logger = get_logger()
+
+
+# ==== EMBEDDERS ==== #
+class HashingEmbedder:
+    """
+    Hashed bag of words. No API calls, so it works offline and in tests.
+    Only captures shared words, use OpenAIEmbedder for real recommendations.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.md5(word.encode("utf-8")).digest()
+                vectors[i, int.from_bytes(digest[:4], "little") % self.dim] += 1
+        return vectors
+
+
+class OpenAIEmbedder:
+    def __init__(self, model: str = Config.EMBEDDING_MODEL, batch_size: int = 256):
+        self.client, _ = shared_openai_clients(Config.OPENAI_API_KEY)
+        self.model = model
+        self.batch_size = batch_size
+        self.name = model
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(
+                model=self.model, input=texts[i : i + self.batch_size]
+            )
+            vectors.extend(item.embedding for item in response.data)
+        return np.array(vectors, dtype=np.float32)
+
+
+class EmbeddingCache:
+    """
+    Vectors keyed by embedder name and text hash, so albums are only
+    embedded once.
+    """
+
+    def __init__(self, db_path=None):
+        db_path = db_path or Config.cache_path("embedding_cache")
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB)"
+            )
+
+    def embed(self, embedder, texts: list) -> np.ndarray:
+        """Embed texts, only calling the embedder for ones not cached."""
+        keys = [
+            f"{embedder.name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+            for text in texts
+        ]
+
+        with self.lock:
+            cached = {}
+            for key in set(keys):
+                row = self.conn.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    cached[key] = np.frombuffer(row[0], dtype=np.float32)
+
+        missing = sorted(
+            {key: text for key, text in zip(keys, texts) if key not in cached}.items()
+        )
+        if missing:
+            logger.info(f"Embedding {len(missing)} albums with {embedder.name}")
+            vectors = embedder.embed([text for _, text in missing])
+            with self.lock, self.conn:
+                for (key, _), vector in zip(missing, vectors):
+                    cached[key] = vector
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                        (key, vector.astype(np.float32).tobytes()),
+                    )
+
+        return np.stack([cached[key] for key in keys]) if keys else np.zeros((0, 0))
+
+
+# ==== HELPERS ==== #
+def album_text(title: str, tracklist=None) -> str:
+    """Text embedded for an album: title, then track names."""
+    parts = [title]
+    if tracklist:
+        parts.append("Tracks: " + ", ".join(tracklist))
+    return "\n".join(parts)
+
+
+def normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def load_candidates(path) -> list:
+    """Candidate albums from a JSONL catalogue (empty list if missing)."""
+    path = Path(path)
+    if not path.exists():
+        logger.warning(f"No candidate catalogue at {path}")
+        return []
+
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ==== RECOMMENDER ==== #
+class EmbeddingRecommender:
+    def __init__(
+        self,
+        sheeter,
+        embedder=None,
+        candidates: list = None,
+        cache: EmbeddingCache = None,
+        rerank_model: str = None,
+    ):
+        """
+        :param embedder: OpenAIEmbedder by default, HashingEmbedder for offline use.
+        :param candidates: list of candidate album dicts, defaults to
+            Config.CANDIDATE_CATALOGUE.
+        :param rerank_model: if set, this LLM re-ranks a short list of candidates.
+        """
+        logger.info("Starting Embedding Recommender")
+
+        self.sheeter = sheeter
+        self.embedder = embedder or OpenAIEmbedder()
+        self.cache = cache or EmbeddingCache()
+        self.candidates = (
+            candidates
+            if candidates is not None
+            else load_candidates(Config.CANDIDATE_CATALOGUE)
+        )
+        self.llm = get_llm_client(model=rerank_model) if rerank_model else None
+
+        self.candidate_matrix = None
+        self._owned = None  # (store version, OwnershipIndex, owned matrix)
+
+    def owned(self):
+        """
+        Ownership index and normalised embedding matrix, rebuilt when the
+        collection changes.
+        """
+        self.sheeter.sync_if_stale()
+        version = self.sheeter.store.version
+        if self._owned and self._owned[0] == version:
+            return self._owned[1], self._owned[2]
+
+        records = self.sheeter.get_records()
+        texts = []
+        for record in records:
+            title = (
+                record.get("discogs_title")
+                or f"{record.get('artist')} - {record.get('album_title')}"
+            )
+            try:
+                tracklist = json.loads(record.get("tracklist") or "[]")
+            except (TypeError, ValueError):
+                tracklist = []
+            texts.append(album_text(title, tracklist))
+
+        index = OwnershipIndex(records)
+        matrix = normalise_rows(self.cache.embed(self.embedder, texts))
+        self._owned = (version, index, matrix)
+        return index, matrix
+
+    def get_candidate_matrix(self) -> np.ndarray:
+        if self.candidate_matrix is None:
+            texts = [
+                album_text(f"{c['artist']} - {c['album']}", c.get("tracklist"))
+                for c in self.candidates
+            ]
+            self.candidate_matrix = normalise_rows(
+                self.cache.embed(self.embedder, texts)
+            )
+        return self.candidate_matrix
+
+    @staticmethod
+    def album_key(artist, album) -> tuple:
+        return normalise_name(artist), normalise_name(album)
+
+    def score_candidates(self):
+        """
+        Similarity of each candidate to its nearest owned album, and the
+        candidate indexes not already owned, sorted most similar first.
+        """
+        owned_index, owned_matrix = self.owned()
+        candidate_matrix = self.get_candidate_matrix()
+
+        if len(owned_matrix) == 0 or len(candidate_matrix) == 0:
+            return np.zeros(len(self.candidates)), []
+
+        similarity = (candidate_matrix @ owned_matrix.T).max(axis=1)
+
+        ranked = [
+            i
+            for i in np.argsort(-similarity)
+            if not owned_index.owns(
+                self.candidates[i]["artist"], self.candidates[i]["album"]
+            )
+        ]
+        return similarity, ranked
+
+    def recommend_albums(
+        self, taste_distance: int = 5, n_suggestions: int = 5, exclude: list = None
+    ) -> RecommendedAlbums:
+        """
+        Suggest n albums from the candidate catalogue.
+        taste_distance 1-10 picks a band of candidates ranked by similarity:
+        1 is the most similar tenth, 10 the least similar tenth.
+        exclude lists RecommendedAlbum not to suggest, e.g. ones already shown.
+        """
+        if taste_distance not in range(1, 11):
+            raise ValueError("taste_distance must be an integer between 1 and 10")
+
+        similarity, ranked = self.score_candidates()
+
+        if exclude:
+            excluded = {self.album_key(album.artist, album.album) for album in exclude}
+            ranked = [
+                i
+                for i in ranked
+                if self.album_key(
+                    self.candidates[i]["artist"], self.candidates[i]["album"]
+                )
+                not in excluded
+            ]
+
+        n_shortlist = n_suggestions * 3 if self.llm else n_suggestions
+        start = len(ranked) * (taste_distance - 1) // 10
+        end = len(ranked) * taste_distance // 10
+        # Widen small bands (small catalogues) so there's enough to pick from
+        if end - start < n_shortlist:
+            start = max(0, min(start, len(ranked) - n_shortlist))
+            end = start + n_shortlist
+        band = ranked[start:end]
+
+        # Random picks within the band so repeat calls vary
+        rng = np.random.default_rng()
+        picks = rng.choice(band, size=min(n_shortlist, len(band)), replace=False)
+        shortlist = [
+            RecommendedAlbum(
+                artist=self.candidates[i]["artist"], album=self.candidates[i]["album"]
+            )
+            for i in sorted(picks, key=lambda i: -similarity[i])
+        ]
+
+        if self.llm and len(shortlist) > n_suggestions:
+            shortlist = self.rerank(shortlist, n_suggestions, taste_distance)
+
+        return RecommendedAlbums(albums=shortlist[:n_suggestions])
+
+    async def arecommend_albums(
+        self, taste_distance: int = 5, n_suggestions: int = 5, exclude: list = None
+    ) -> RecommendedAlbums:
+        """
+        Async version of recommend_albums, embedding calls run in a thread.
+        """
+        return await asyncio.to_thread(
+            self.recommend_albums, taste_distance, n_suggestions, exclude
+        )
+
+    def parse_albums(self, results: RecommendedAlbums) -> str:
+        return "".join(f"{album.artist} - {album.album}\n" for album in results.albums)
+
+    def rerank(self, shortlist: list, n_suggestions: int, taste_distance: int) -> list:
+        """Ask the LLM to pick the best n from a short list. Small prompt, one call."""
+        owned_index, _ = self.owned()
+        owned_artists = sorted(owned_index.artists)[:200]
+        options = "\n".join(f"- {album.artist} - {album.album}" for album in shortlist)
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are an expert record collector helping choose albums to buy."
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Artists I own: {', '.join(owned_artists)}\n\n"
+                    f"From these options only:\n{options}\n\n"
+                    f"Pick the {n_suggestions} albums I'd most enjoy at taste "
+                    f"distance {taste_distance} (1 = very close to my taste, "
+                    "10 = very exploratory)."
+                ),
+            },
+        ]
+
+        try:
+            result = self.llm.parse_completion(
+                messages=messages, response_format=RecommendedAlbums
+            )
+        except Exception as e:
+            logger.error(f"Re-rank failed, using embedding order: {e}")
+            return shortlist
+
+        # Only accept albums from the short list
+        allowed = {self.album_key(a.artist, a.album): a for a in shortlist}
+        picked = [
+            allowed[key]
+            for key in (self.album_key(a.artist, a.album) for a in result.albums)
+            if key in allowed
+        ]
+        rest = [a for a in shortlist if a not in picked]
+        return picked + rest
+
+
+if __name__ == "__main__":
+    sheeter = GoogleSheeter()
+    recommender = EmbeddingRecommender(sheeter=sheeter)
+    results = recommender.recommend_albums(taste_distance=3, n_suggestions=5)
+    for album in results.albums:
+        print(f"{album.artist} - {album.album}")
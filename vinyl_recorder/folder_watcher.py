@@ -0,0 +1,147 @@
+"""
+Watch the images directory and process new album photos as they arrive.
+
+Uses filesystem events (inotify on Linux) when the optional watchdog package
+is installed, otherwise polls. Arrivals are debounced so a folder of photos
+copied in at once is handled as a few micro-batches rather than one by one.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+from vinyl_recorder.config import Config, get_logger
+
+logger = get_logger()
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class NewImageHandler(FileSystemEventHandler):
+    """Sets an event whenever an image is created or moved into the directory."""
+
+    def __init__(self, extensions: tuple, arrived: threading.Event):
+        self.extensions = {f".{ext.lower()}" for ext in extensions}
+        self.arrived = arrived
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ("created", "moved", "closed"):
+            return
+
+        path = getattr(event, "dest_path", "") or event.src_path
+        if Path(path).suffix.lower() in self.extensions:
+            self.arrived.set()
+
+
+class FolderWatcher:
+    def __init__(
+        self,
+        tracker,
+        on_batch,
+        debounce_seconds: float = Config.WATCH_DEBOUNCE_SECONDS,
+        poll_seconds: float = Config.WATCH_POLL_SECONDS,
+        max_batch: int = Config.SHEET_BATCH_SIZE,
+    ):
+        """
+        :param tracker: CollectionTracker for the watched images directory.
+        :param on_batch: called with a list of pending image paths, e.g. to
+            identify, append and enrich them.
+        :param debounce_seconds: wait for this long without new arrivals
+            before processing, so copies in progress are finished.
+        :param poll_seconds: rescan interval. Without watchdog this is the
+            only way new files are seen, with it it's a safety net.
+        :param max_batch: most images handed to on_batch at once.
+        """
+        self.tracker = tracker
+        self.on_batch = on_batch
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.max_batch = max_batch
+
+        self.arrived = threading.Event()
+        self.stopped = threading.Event()
+        self.observer = None
+        self.attempted = {}  # {image name: mtime} already handed to on_batch
+
+    def start_observer(self):
+        if Observer is None:
+            logger.info(
+                f"watchdog not installed, polling {self.tracker.images_path} "
+                f"every {self.poll_seconds}s"
+            )
+            return
+
+        handler = NewImageHandler(self.tracker.image_types, self.arrived)
+        self.observer = Observer()
+        self.observer.schedule(handler, str(self.tracker.images_path), recursive=False)
+        self.observer.start()
+        logger.info(f"Watching {self.tracker.images_path} for new images")
+
+    def wait_for_quiet(self):
+        """Block until no new arrivals for debounce_seconds."""
+        while self.arrived.wait(timeout=self.debounce_seconds):
+            self.arrived.clear()
+            if self.stopped.is_set():
+                return
+
+    def process_pending(self) -> int:
+        """Hand pending images to on_batch in micro-batches. Returns number processed."""
+        settled_before = time.time() - self.debounce_seconds
+        pending = []
+        mtimes = {}
+
+        for path in self.tracker.get_pending_images():
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+
+            if mtime > settled_before:
+                # May still be copying, leave it for the next pass
+                self.arrived.set()
+            elif self.attempted.get(path.name) != mtime:
+                pending.append(path)
+                mtimes[path.name] = mtime
+
+        for i in range(0, len(pending), self.max_batch):
+            if self.stopped.is_set():
+                break
+            batch = pending[i : i + self.max_batch]
+            logger.info(f"Processing {len(batch)} new images")
+            start = time.monotonic()
+            self.on_batch(batch)
+            for path in batch:
+                # Images that failed aren't retried until they change or the watcher restarts
+                self.attempted[path.name] = mtimes[path.name]
+            logger.info(f"Batch done in {time.monotonic() - start:.1f}s")
+
+        return len(pending)
+
+    def run(self):
+        """Process anything already pending, then keep watching until stop()."""
+        self.start_observer()
+
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.process_pending()
+                except Exception as e:
+                    # Keep watching, failed images are still pending next time
+                    logger.error(f"Failed to process new images: {e}")
+
+                if self.arrived.wait(timeout=self.poll_seconds):
+                    self.arrived.clear()
+                    self.wait_for_quiet()
+        finally:
+            if self.observer:
+                self.observer.stop()
+                self.observer.join()
+
+    def stop(self):
+        self.stopped.set()
+        self.arrived.set()
@@ -3,7 +3,9 @@ import pandas as pd
 import base64
 import json
 import gspread
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
 from vinyl_recorder.config import Config, get_logger
+from vinyl_recorder.collection_store import CollectionStore
 from google.oauth2.service_account import Credentials
 
 logger = get_logger()
@@ -15,7 +17,10 @@ class GoogleSheeter:
         self.client = self.connect_client()
         self.sheet_id = Config.vinyl_sheet_id()
         self.sheet = self.load_sheet()
-        self.df_sheet = self.load_sheet_as_df()
+
+        # Local mirror of the sheet that serves all reads
+        self.store = CollectionStore(Config.cache_path("collection_store"))
+        self.sync()
 
     def connect_client(self):
         json_bytes = base64.b64decode(Config.GOOGLE_SERVICE_ACCOUNT)
@@ -41,93 +46,189 @@ class GoogleSheeter:
         data = self.sheet.get_all_records()
         return pd.DataFrame(data)
 
+    def sync(self):
+        """
+        Pull the full sheet into the local store.
+        Picks up any manual edits made directly in google sheets.
+        """
+        self.headers = self.get_headers()
+        self.column_numbers = {name: i for i, name in enumerate(self.headers, 1)}
+        self.store.replace_all(self.sheet.get_all_records())
+
+    def sync_if_stale(self):
+        """Re-sync from the sheet if the local store is older than SHEET_SYNC_SECONDS."""
+        if self.store.is_stale(Config.SHEET_SYNC_SECONDS):
+            self.sync()
+
+    @property
+    def df_sheet(self) -> pd.DataFrame:
+        """Sheet data as a DataFrame, served from the local store."""
+        return self.store.to_df()
+
     def refresh_df(self):
-        """Reload DataFrame from sheet (call after making changes)."""
-        self.df_sheet = self.load_sheet_as_df()
+        """Return DataFrame from the local store (re-syncs if stale)."""
+        self.sync_if_stale()
         return self.df_sheet
 
+    def get_records(self) -> list:
+        """All rows as a list of dicts, served from the local store."""
+        self.sync_if_stale()
+        return list(self.store.iter_records())
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """Full text search over artist, titles and tracklists in the local store."""
+        return self.store.search(query, limit)
+
     def get_existing_values(self, column_name: str) -> set:
         """Get unique values from a column as a set."""
-        df = self.refresh_df()
-        if column_name in df.columns:
-            return set(df[column_name].dropna().unique())
-        return set()
+        self.sync_if_stale()
+        return self.store.get_existing_values(column_name)
 
     def is_duplicate(self, artist: str, album_title: str) -> bool:
         """Check if album already exists in sheet."""
+        self.sync_if_stale()
+        return self.store.is_duplicate(artist, album_title)
 
-        df = self.refresh_df()
-        # Handle empty sheet
-        if df.empty or "artist" not in df.columns:
-            return False
-
-        matches = df[(df["artist"] == artist) & (df["album_title"] == album_title)]
-        return len(matches) > 0
-
-    def append_row(self, row_data: list):
+    def append_row(self, row_data: list) -> int:
         """
         Append a new row to the sheet.
         row_data should be a list matching column order.
+        Returns the new row number.
+        """
+        return self.append_rows([row_data])[0]
+
+    def append_rows(self, rows: list) -> list:
+        """
+        Append many rows to the sheet in a single API request.
+        Each row should be a list matching column order.
+        Returns the new row numbers.
+        """
+        if not rows:
+            return []
+
+        response = self.sheet.append_rows(rows)
+        first_row_num = self.first_appended_row(response)
+        row_nums = list(range(first_row_num, first_row_num + len(rows)))
+
+        for row_num, row_data in zip(row_nums, rows):
+            self.store.insert_row(row_num, dict(zip(self.headers, row_data)))
+
+        logger.info(f"Appended {len(rows)} rows from row {first_row_num}")
+        return row_nums
+
+    def first_appended_row(self, response: dict) -> int:
+        """
+        Row number of the first appended row, from the append response's
+        updatedRange e.g. "Sheet1!A5:K7". Falls back to the local store if missing.
         """
-        self.sheet.append_row(row_data)
-        logger.info(f"Appended row: {row_data[0]}")
+        updated_range = (response or {}).get("updates", {}).get("updatedRange")
+        if not updated_range:
+            return self.store.next_row_num()
+
+        first_cell = updated_range.split("!")[-1].split(":")[0]
+        return a1_to_rowcol(first_cell)[0]
 
     def find_row_by_image_name(self, image_name: str) -> int:
         """
         Find row number for a given image_name.
         Returns row number (1-indexed) or None if not found.
         """
-        try:
-            cell = self.sheet.find(image_name)
-            return cell.row
-        except gspread.exceptions.CellNotFound:
+        row_num = self.store.find_row_by_image_name(image_name)
+        if row_num is None:
             logger.warning(f"Image not found: {image_name}")
-            return None
+        return row_num
 
     def update_cell(self, row_num: int, col_num: int, value):
-        """Update a specific cell."""
-        self.sheet.update_cell(row_num, col_num, value)
+        """Update a specific cell, keeping the store in step."""
+        self.update_rows_cells({row_num: {self.headers[col_num - 1]: value}})
 
     def update_row_cells(self, row_num: int, updates: dict):
         """
         Update multiple cells in a row.
         updates is a dict of {column_name: value}
         """
-        # Get column positions from headers
-        headers = self.sheet.row_values(1)
+        self.update_rows_cells({row_num: updates})
+
+    def update_rows_cells(self, row_updates: dict):
+        """
+        Update many cells across many rows in a single API request.
+        row_updates is a dict of {row_num: {column_name: value}}
+        """
+        if not row_updates:
+            return
+
+        row_updates = self.check_row_positions(row_updates)
+
+        data = []
+        for row_num, updates in row_updates.items():
+            for col_name, value in updates.items():
+                col_num = self.column_numbers[col_name]
+                data.append(
+                    {"range": rowcol_to_a1(row_num, col_num), "values": [[value]]}
+                )
 
-        for col_name, value in updates.items():
-            col_num = headers.index(col_name) + 1  # 1-indexed
-            self.update_cell(row_num, col_num, value)
+        self.sheet.batch_update(data)
 
-        logger.info(f"Updated row {row_num}")
+        for row_num, updates in row_updates.items():
+            self.store.update_row(row_num, updates)
+
+        logger.info(f"Updated {len(row_updates)} rows ({len(data)} cells)")
+
+    def check_row_positions(self, row_updates: dict) -> dict:
+        """
+        Rows can be sorted or deleted by hand in the sheet after the last sync,
+        so check each target row still holds the image the store expects,
+        reading the image_name column in one request. Moved rows are remapped
+        by image name, and rows no longer found exactly once are dropped.
+        """
+        expected = {
+            row_num: self.store.image_name_at(row_num) or "" for row_num in row_updates
+        }
+        column = self.sheet.col_values(self.column_numbers["image_name"])
+
+        moved = [
+            row_num
+            for row_num, image_name in expected.items()
+            if (column[row_num - 1] if row_num <= len(column) else "") != image_name
+        ]
+        if not moved:
+            return row_updates
+
+        logger.warning(
+            f"{len(moved)} rows moved in the sheet since the last sync, re-syncing"
+        )
+        self.sync()
+
+        positions = {}  # {image name: [row numbers]}
+        for row_num, image_name in enumerate(column[1:], start=2):
+            if image_name:
+                positions.setdefault(image_name, []).append(row_num)
+
+        remapped = {}
+        for row_num, updates in row_updates.items():
+            rows = positions.get(expected[row_num], [])
+            if expected[row_num] and len(rows) == 1:
+                remapped[rows[0]] = updates
+            else:
+                logger.warning(
+                    f"Skipping update for row {row_num} ({expected[row_num]}), "
+                    "not found once in the sheet"
+                )
+        return remapped
 
     def iterate_rows_needing_enrichment(self):
         """
         Generator that yields rows missing enrichment data.
         Yields (row_number, row_dict) for each row needing enrichment.
         """
-        df = self.refresh_df()
-
-        # Handle empty sheet or missing column
-        if df.empty or "discogs_title" not in df.columns:
-            return  # No rows to enrich
+        self.sync_if_stale()
 
-        # Find rows where discogs_title is empty/missing
-        mask = (df["discogs_title"].isna()) | (df["discogs_title"] == "")
-        rows_needing_enrichment = df[mask]
-
-        for idx, row in rows_needing_enrichment.iterrows():
-            # Find actual sheet row number (accounting for header)
-            row_num = idx + 2  # +2 because: +1 for header, +1 for 1-indexing
-            yield row_num, row.to_dict()
+        for row_num, row in self.store.rows_needing_enrichment():
+            yield row_num, row
 
     def get_column_number(self, column_name: str) -> int:
         """Get column number (1-indexed) for a column name."""
-        headers = self.sheet.row_values(1)
-        if column_name in headers:
-            return headers.index(column_name) + 1
-        return None
+        return self.column_numbers.get(column_name)
 
     def get_headers(self) -> list:
         """Get list of column headers from sheet."""
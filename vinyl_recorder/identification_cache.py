@@ -0,0 +1,149 @@
+"""
+Persistent cache of LLM identification results keyed by image content.
+
+Avoids paying for another LLM call when the same cover photo is sent again,
+or the same file appears twice under different names.
+"""
+
+import base64
+import hashlib
+import sqlite3
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image
+from pydantic import BaseModel
+
+from vinyl_recorder.config import Config, get_logger
+
+logger = get_logger()
+
+
+def content_hash(image_base64: str) -> str:
+    """Exact match key for an image."""
+    return hashlib.sha256(image_base64.encode("utf-8")).hexdigest()
+
+
+def perceptual_hash(image_base64: str) -> int:
+    """
+    64 bit difference hash (dHash). Near identical photos of the same cover
+    give hashes that differ in only a few bits.
+    """
+    image = Image.open(BytesIO(base64.b64decode(image_base64)))
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata())
+
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+class IdentificationCache:
+    def __init__(
+        self,
+        db_path=None,
+        ttl_seconds: int = Config.ID_CACHE_TTL_SECONDS,
+        max_entries: int = Config.ID_CACHE_MAX_ENTRIES,
+        use_perceptual_hash: bool = Config.ID_CACHE_PERCEPTUAL,
+        max_distance: int = Config.ID_CACHE_MAX_DISTANCE,
+    ):
+        db_path = db_path or Config.cache_path("identification_cache")
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.use_perceptual_hash = use_perceptual_hash
+        self.max_distance = max_distance
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS identifications (
+                    content_hash TEXT PRIMARY KEY,
+                    phash TEXT,
+                    data TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """)
+
+    def get(self, image_base64: str, response_format: type[BaseModel]):
+        """Return cached result for this image parsed as response_format, or None."""
+        key = content_hash(image_base64)
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM identifications WHERE created < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            row = self.conn.execute(
+                "SELECT content_hash, data FROM identifications WHERE content_hash = ?",
+                (key,),
+            ).fetchone()
+
+        if row is None and self.use_perceptual_hash:
+            row = self._find_near_duplicate(perceptual_hash(image_base64))
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE identifications SET last_used = ? WHERE content_hash = ?",
+                (time.time(), row[0]),
+            )
+
+        logger.info(f"Identification cache hit ({self.stats})")
+        return response_format.model_validate_json(row[1])
+
+    def put(self, image_base64: str, result: BaseModel):
+        """Store a result, evicting least recently used entries over max_entries."""
+        phash = None
+        if self.use_perceptual_hash:
+            phash = format(perceptual_hash(image_base64), "016x")
+
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO identifications VALUES (?, ?, ?, ?, ?)",
+                (content_hash(image_base64), phash, result.model_dump_json(), now, now),
+            )
+            self.conn.execute(
+                """
+                DELETE FROM identifications WHERE content_hash NOT IN (
+                    SELECT content_hash FROM identifications
+                    ORDER BY last_used DESC LIMIT ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    @property
+    def stats(self) -> str:
+        return f"hits={self.hits} misses={self.misses}"
+
+    def _find_near_duplicate(self, phash: int):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT content_hash, data, phash FROM identifications "
+                "WHERE phash IS NOT NULL"
+            ).fetchall()
+
+        best = None
+        best_distance = self.max_distance + 1
+        for key, data, other in rows:
+            distance = (phash ^ int(other, 16)).bit_count()
+            if distance < best_distance:
+                best, best_distance = (key, data), distance
+
+        return best
@@ -0,0 +1,142 @@
+"""
+Local manifest of the files in an images directory.
+
+Stores name, mtime, size and content hash for each image so repeat runs
+only hash files that are new or have changed. If the directory itself
+hasn't changed since the last scan it isn't listed again, only the known
+files are stat'ed, so a file edited in place is still re-hashed.
+Files modified in the last few seconds may still be being written, so their
+hashes aren't saved and the directory is listed again on the next scan.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from vinyl_recorder.config import Config, get_logger
+
+logger = get_logger()
+
+
+def file_hash(path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageManifest:
+    def __init__(
+        self,
+        images_path,
+        db_path=None,
+        settle_seconds: float = Config.WATCH_DEBOUNCE_SECONDS,
+    ):
+        self.images_path = Path(images_path)
+        # Files modified more recently than this aren't treated as finished
+        self.settle_seconds = settle_seconds
+        db_path = Path(db_path or Config.cache_path("image_manifest"))
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    dir TEXT,
+                    name TEXT,
+                    mtime_ns INTEGER,
+                    size INTEGER,
+                    sha1 TEXT,
+                    PRIMARY KEY (dir, name)
+                )
+                """)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs "
+                "(dir TEXT PRIMARY KEY, mtime_ns INTEGER, extensions TEXT)"
+            )
+
+    def scan(self, extensions: tuple) -> dict:
+        """
+        Return {file name: content hash} for images in the directory with
+        one of the given extensions (case insensitive, without the dot).
+        """
+        dir_key = str(self.images_path.resolve())
+        dir_mtime = self.images_path.stat().st_mtime_ns
+        extensions = {f".{ext.lower().lstrip('.')}" for ext in extensions}
+        extensions_key = ",".join(sorted(extensions))
+
+        with self.lock:
+            known = {
+                name: (mtime_ns, size, sha1)
+                for name, mtime_ns, size, sha1 in self.conn.execute(
+                    "SELECT name, mtime_ns, size, sha1 FROM files WHERE dir = ?",
+                    (dir_key,),
+                )
+            }
+            row = self.conn.execute(
+                "SELECT mtime_ns, extensions FROM dirs WHERE dir = ?", (dir_key,)
+            ).fetchone()
+
+        if row == (dir_mtime, extensions_key):
+            # No files added, removed or renamed since the last scan, so
+            # only the known files need checking for edits
+            names = list(known)
+        else:
+            with os.scandir(self.images_path) as entries:
+                names = [
+                    entry.name
+                    for entry in entries
+                    if entry.is_file() and Path(entry.name).suffix.lower() in extensions
+                ]
+
+        current = {}
+        changed = []
+        n_unsettled = 0
+        settled_before = time.time_ns() - int(self.settle_seconds * 1e9)
+        for name in names:
+            path = self.images_path / name
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Removed since it was listed
+
+            previous = known.get(name)
+            if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                current[name] = previous
+            else:
+                entry_data = (stat.st_mtime_ns, stat.st_size, file_hash(path))
+                current[name] = entry_data
+                if stat.st_mtime_ns < settled_before:
+                    changed.append((dir_key, name, *entry_data))
+                else:
+                    # Maybe still being written, hash it again next scan
+                    n_unsettled += 1
+
+        # Also drops files with extensions no longer scanned for
+        removed = [(dir_key, name) for name in known if name not in current]
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", changed
+            )
+            self.conn.executemany(
+                "DELETE FROM files WHERE dir = ? AND name = ?", removed
+            )
+            # A listing with unsettled files isn't reused, so they're
+            # picked up even if nothing else changes
+            self.conn.execute(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                (dir_key, None if n_unsettled else dir_mtime, extensions_key),
+            )
+
+        logger.info(
+            f"Scanned {self.images_path}: {len(current)} images, "
+            f"{len(changed)} new or changed, {len(removed)} removed"
+            + (f", {n_unsettled} still being written" if n_unsettled else "")
+        )
+        return {name: data[2] for name, data in current.items()}
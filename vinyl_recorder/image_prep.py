@@ -0,0 +1,70 @@
+"""
+Shrink photos before sending them to the LLM.
+
+Phone photos are several MB each. The model doesn't need that resolution to
+read an album cover, so images are EXIF-rotated, resized and re-encoded as JPEG.
+"""
+
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from pydantic import BaseModel
+
+from vinyl_recorder.config import Config, get_logger
+
+logger = get_logger()
+
+# HEIC photos (iPhone default) need the optional pillow-heif plugin
+try:
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()
+except ImportError:
+    pass
+
+
+# ==== DATA MODELS ==== #
+class PreparedImage(BaseModel):
+    image_base64: str
+    original_bytes: int
+    prepared_bytes: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.prepared_bytes
+
+
+def prepare_image(
+    image_bytes: bytes,
+    max_edge: int = Config.IMAGE_MAX_EDGE,
+    quality: int = Config.IMAGE_JPEG_QUALITY,
+) -> PreparedImage:
+    """
+    EXIF-rotate, resize so the longest edge is at most max_edge and
+    re-encode as JPEG at the given quality.
+    """
+    image = Image.open(BytesIO(image_bytes))
+
+    # Phone cameras store rotation in EXIF rather than rotating pixels
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    prepared = buffer.getvalue()
+
+    result = PreparedImage(
+        image_base64=base64.b64encode(prepared).decode("utf-8"),
+        original_bytes=len(image_bytes),
+        prepared_bytes=len(prepared),
+    )
+
+    logger.info(
+        f"Prepared image {image.width}x{image.height}: "
+        f"{result.original_bytes / 1024:.0f}KB -> {result.prepared_bytes / 1024:.0f}KB "
+        f"({result.bytes_saved / 1024:.0f}KB saved)"
+    )
+
+    return result
@@ -1,29 +1,134 @@
 # LLM client connection
-from openai import OpenAI
+import asyncio
+import contextlib
+import random
+import threading
+import time
+
+import openai
+from openai import AsyncOpenAI, OpenAI
 from vinyl_recorder.config import Config, get_logger
 
 logger = get_logger()
 
+# Errors worth retrying: rate limits, server errors and dropped connections
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+
+
+# Shared process wide: one connection pool per api key and one limit
+# on requests in flight across every LLMClient, sync and async calls alike
+_openai_clients = {}  # {api_key: (OpenAI, AsyncOpenAI)}
+_shared_lock = threading.Lock()
+_semaphore = threading.BoundedSemaphore(Config.LLM_MAX_IN_FLIGHT)
+# How often an async call waiting for a free slot checks again
+_ASYNC_SLOT_POLL_SECONDS = 0.05
+
+
+def shared_openai_clients(api_key: str):
+    """Sync and async OpenAI clients, created once per process."""
+    with _shared_lock:
+        if api_key not in _openai_clients:
+            # Retries are handled by LLMClient so they respect the in flight limit
+            _openai_clients[api_key] = (
+                OpenAI(api_key=api_key, base_url=Config.OPENAI_BASE_URL, max_retries=0),
+                AsyncOpenAI(
+                    api_key=api_key, base_url=Config.OPENAI_BASE_URL, max_retries=0
+                ),
+            )
+        return _openai_clients[api_key]
+
+
+@contextlib.asynccontextmanager
+async def async_slot():
+    """
+    Take a slot from the shared in flight limit without blocking the event
+    loop. Polls rather than waiting in a thread so a cancelled call never
+    ends up holding a slot.
+    """
+    while not _semaphore.acquire(blocking=False):
+        await asyncio.sleep(_ASYNC_SLOT_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        _semaphore.release()
+
 
 # Setup class incase later want to try switching betweem LLMs
 class LLMClient:
-    def __init__(self, api_key: str, model: str):
+    def __init__(
+        self, api_key: str, model: str, max_retries: int = Config.LLM_MAX_RETRIES
+    ):
         logger.info("Starting LLMClient")
-        self.client = OpenAI(api_key=api_key)
+        self.client, self.async_client = shared_openai_clients(api_key)
         self.model = model
+        self.max_retries = max_retries
+
+        # Usage totals across all calls
+        self.stats_lock = threading.Lock()
+        self.n_calls = 0
+        self.total_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
 
     def parse_completion(self, messages, response_format):
         """
         For stuctured respones with pydantic use completions.parse
         """
-        try:
-            completion = self.client.beta.chat.completions.parse(
-                model=self.model, messages=messages, response_format=response_format
-            )
+        for attempt in range(self.max_retries + 1):
+            try:
+                with _semaphore:
+                    start = time.monotonic()
+                    completion = self.client.beta.chat.completions.parse(
+                        model=self.model,
+                        messages=messages,
+                        response_format=response_format,
+                    )
+                self.record_usage(completion, time.monotonic() - start)
+                break
+
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    logger.error(f"LLM parse failed after {attempt + 1} attempts: {e}")
+                    raise
+                time.sleep(self.backoff_seconds(attempt, e))
+
+            except Exception as e:
+                logger.error(f"LLM parse failed: {e}")
+                raise
+
+        results = completion.choices[0].message.parsed
+
+        return results
 
-        except Exception as e:
-            logger.error(f"LLM parse failed: {e}")
-            raise
+    async def aparse_completion(self, messages, response_format):
+        """
+        Async version of parse_completion.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with async_slot():
+                    start = time.monotonic()
+                    completion = await self.async_client.beta.chat.completions.parse(
+                        model=self.model,
+                        messages=messages,
+                        response_format=response_format,
+                    )
+                self.record_usage(completion, time.monotonic() - start)
+                break
+
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    logger.error(f"LLM parse failed after {attempt + 1} attempts: {e}")
+                    raise
+                await asyncio.sleep(self.backoff_seconds(attempt, e))
+
+            except Exception as e:
+                logger.error(f"LLM parse failed: {e}")
+                raise
 
         results = completion.choices[0].message.parsed
 
@@ -33,21 +138,64 @@ class LLMClient:
         """
         For non-structured chat responses if required
         """
-        completion = self.client.chat.completions.create(
-            model=self.model, messages=messages
-        )
+        with _semaphore:
+            start = time.monotonic()
+            completion = self.client.chat.completions.create(
+                model=self.model, messages=messages
+            )
+        self.record_usage(completion, time.monotonic() - start)
 
         return completion
 
+    def backoff_seconds(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with full jitter."""
+        wait = random.uniform(0, min(30, 2**attempt))
+        logger.warning(
+            f"LLM call failed ({type(error).__name__}), retrying in {wait:.1f}s"
+        )
+        return wait
+
+    def record_usage(self, completion, seconds: float):
+        usage = completion.usage
+        prompt_tokens = usage.prompt_tokens if usage else 0
+        completion_tokens = usage.completion_tokens if usage else 0
+
+        with self.stats_lock:
+            self.n_calls += 1
+            self.total_seconds += seconds
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+        logger.info(
+            f"LLM call took {seconds:.2f}s "
+            f"({prompt_tokens} prompt + {completion_tokens} completion tokens)"
+        )
+
+    @property
+    def stats(self) -> str:
+        return (
+            f"{self.n_calls} calls, {self.total_seconds:.1f}s, "
+            f"{self.prompt_tokens} prompt + {self.completion_tokens} completion tokens"
+        )
+
+
+_clients = {}  # {(llm, model): LLMClient}
+_clients_lock = threading.Lock()
+
 
 def get_llm_client(llm="openai", model=Config.OPENAI_MODEL):
     """
     Probably wont need a different llm but put this here in case.
+    Clients are shared process wide, one per llm/model.
     """
-    if llm == "openai":
-        client = LLMClient(api_key=Config.OPENAI_API_KEY, model=model)
-
-    return client
+    with _clients_lock:
+        if (llm, model) not in _clients:
+            if llm == "openai":
+                _clients[(llm, model)] = LLMClient(
+                    api_key=Config.OPENAI_API_KEY, model=model
+                )
+
+        return _clients[(llm, model)]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+"""
+Index of owned albums for checking recommendations against the collection.
+
+Artist and album names are normalised (case, accents, punctuation, a leading
+"The", "&" vs "and", bracketed edition notes) so "The Beatles - Abbey Road
+(Remastered)" matches "beatles - abbey road". Lookups are a set check, with a
+fuzzy fallback only over the albums owned by the same artist.
+"""
+
+import difflib
+import re
+import unicodedata
+
+from vinyl_recorder.config import Config
+
+
+def normalise_name(text) -> str:
+    """Fold an artist or album name to a comparable key."""
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[\(\[].*?[\)\]]", " ", text)  # (Remastered), [Deluxe Edition]
+    text = text.replace("&", " and ")
+    text = re.sub(r"[^\w\s]", "", text)
+    text = re.sub(r"^the\s+", "", text.strip())
+    return " ".join(text.split())
+
+
+class OwnershipIndex:
+    def __init__(self, records: list, cutoff: float = Config.OWNED_MATCH_CUTOFF):
+        """
+        :param records: sheet records with artist, album_title and discogs_title.
+        :param cutoff: difflib similarity (0-1) for a fuzzy album title match.
+        """
+        self.cutoff = cutoff
+        self.keys = set()
+        self.albums_by_artist = {}  # {artist key: [album keys]}
+
+        for record in records:
+            self.add(record.get("artist"), record.get("album_title"))
+
+            # Discogs titles are "Artist - Album" and often closer to the canonical names
+            discogs_title = str(record.get("discogs_title") or "")
+            if " - " in discogs_title:
+                self.add(*discogs_title.split(" - ", 1))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, artist, album):
+        artist_key, album_key = normalise_name(artist), normalise_name(album)
+        if (artist_key, album_key) not in self.keys:
+            self.keys.add((artist_key, album_key))
+            self.albums_by_artist.setdefault(artist_key, []).append(album_key)
+
+    @property
+    def artists(self) -> set:
+        return set(self.albums_by_artist)
+
+    def owns(self, artist, album) -> bool:
+        artist_key, album_key = normalise_name(artist), normalise_name(album)
+        if (artist_key, album_key) in self.keys:
+            return True
+
+        owned_albums = self.albums_by_artist.get(artist_key, [])
+        return bool(
+            difflib.get_close_matches(album_key, owned_albums, n=1, cutoff=self.cutoff)
+        )
@@ -0,0 +1,118 @@
+"""
+Bounded store of per-user pending photos for the telegram bot.
+
+Entries expire after a TTL, and the least recently used are evicted once
+the total photo bytes or entry count goes over budget, so memory stays flat
+however many users leave photos unconfirmed. Only used from the event loop.
+"""
+
+import time
+from collections import OrderedDict
+
+from vinyl_recorder.config import Config, get_logger
+
+logger = get_logger()
+
+
+class PendingStore:
+    def __init__(
+        self,
+        ttl_seconds: float = Config.PENDING_TTL_SECONDS,
+        max_bytes: int = Config.PENDING_MAX_BYTES,
+        max_entries: int = Config.PENDING_MAX_ENTRIES,
+        on_evict=None,
+    ):
+        """
+        :param on_evict: called with an entry when it expires or is evicted,
+            e.g. to cancel work still running for it.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+
+        self.entries = OrderedDict()  # {key: (added time, size in bytes, entry)}
+        self.total_bytes = 0
+        self.n_expired = 0
+        self.n_evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key) -> bool:
+        self.expire()
+        return key in self.entries
+
+    def __getitem__(self, key) -> dict:
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def get(self, key) -> dict:
+        """Entry for key (None if missing or expired), marked as recently used."""
+        self.expire()
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key][2]
+
+    def put(self, key, entry: dict, size: int):
+        """Add an entry holding size bytes, evicting others if over budget."""
+        self.pop(key)
+        self.entries[key] = (time.monotonic(), size, entry)
+        self.total_bytes += size
+        self.expire()
+
+        while len(self.entries) > 1 and (
+            self.total_bytes > self.max_bytes or len(self.entries) > self.max_entries
+        ):
+            oldest = next(iter(self.entries))
+            self._remove(oldest, evict=True)
+            self.n_evicted += 1
+            logger.info(f"Evicted pending photo for {oldest} ({self.gauges})")
+
+    def set_size(self, key, size: int, entry: dict = None):
+        """
+        Update the bytes held by an entry, e.g. once its photo is released.
+        If entry is given, only update if key still holds that entry.
+        """
+        if key not in self.entries:
+            return
+        added, old_size, current = self.entries[key]
+        if entry is None or entry is current:
+            self.entries[key] = (added, size, current)
+            self.total_bytes += size - old_size
+
+    def pop(self, key) -> dict:
+        """Remove and return an entry without calling on_evict."""
+        if key not in self.entries:
+            return None
+        return self._remove(key, evict=False)
+
+    def expire(self) -> int:
+        """Drop entries older than the TTL. Returns number expired."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, (added, _, _) in self.entries.items() if added < cutoff]
+
+        for key in expired:
+            self._remove(key, evict=True)
+        self.n_expired += len(expired)
+
+        return len(expired)
+
+    def _remove(self, key, evict: bool) -> dict:
+        _, size, entry = self.entries.pop(key)
+        self.total_bytes -= size
+        if evict and self.on_evict:
+            self.on_evict(entry)
+        return entry
+
+    @property
+    def gauges(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "expired": self.n_expired,
+            "evicted": self.n_evicted,
+        }
@@ -0,0 +1,43 @@
+"""
+Token bucket rate limiter shared by threads making calls to a rate limited API.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: int, capacity: int = None):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate_per_second
+        )
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate_per_second
+
+            time.sleep(wait)
+
+    def limit_remaining(self, remaining: int):
+        """
+        Cap available tokens at what the server says is left in its window,
+        so we slow down before getting throttled.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
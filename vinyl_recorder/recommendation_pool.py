@@ -0,0 +1,192 @@
+"""
+Pool of precomputed album recommendations for the telegram bot.
+
+Recommendations for each distance bucket are generated in the background,
+so a /recommend tap is answered straight from the pool. Pools are refilled
+when they run low and regenerated once the owned albums change and then
+stay unchanged for a while, so a run of adds or Discogs enrichment (which
+only fills in existing rows) doesn't set off a burst of LLM calls.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from vinyl_recorder.album_recommender import AlbumRecommender, RecommendedAlbum
+from vinyl_recorder.config import Config, get_logger
+from vinyl_recorder.ownership_index import normalise_name
+
+logger = get_logger()
+
+
+def album_key(album: RecommendedAlbum) -> str:
+    return f"{album.artist.lower().strip()}|{album.album.lower().strip()}"
+
+
+class RecommendationPool:
+    def __init__(
+        self,
+        recommender: AlbumRecommender,
+        distances: tuple = (2, 4, 6, 8),
+        low_water: int = Config.RECOMMEND_POOL_LOW_WATER,
+        settle_seconds: float = Config.RECOMMEND_POOL_SETTLE_SECONDS,
+    ):
+        self.recommender = recommender
+        self.distances = distances
+        self.low_water = low_water
+        self.settle_seconds = settle_seconds
+
+        self.pools = {distance: deque() for distance in distances}
+        # Everything pooled or served per distance since the pools were last
+        # regenerated, so taps don't repeat
+        self.seen = {distance: set() for distance in distances}
+        # The most recent of those, sent with refills so the model suggests
+        # something new rather than its favourites again
+        self.recent = {
+            distance: deque(maxlen=Config.RECOMMEND_POOL_EXCLUDE_MAX)
+            for distance in distances
+        }
+        self.refills = {}  # {distance: running refill task}
+        # Bumped on regeneration so refills started before it are dropped
+        self.generation = 0
+
+        self.collection_version = None
+        self.owned = None  # {(artist, album)} the pools were generated for
+        # When owned albums last changed, None once regenerated
+        self.owned_changed_at = None
+        self.watch_task = None
+
+    def start(self):
+        """Start the background job. Call from inside the bot's event loop."""
+        self.watch_task = asyncio.create_task(self.watch())
+
+    async def watch(self):
+        """Regenerate pools when the owned albums change and top up low ones."""
+        while True:
+            try:
+                await self.check_collection()
+            except Exception as e:
+                logger.error(f"Error checking collection for recommendations: {e}")
+
+            for distance in self.distances:
+                self.refill_if_low(distance)
+
+            await asyncio.sleep(Config.RECOMMEND_POOL_CHECK_SECONDS)
+
+    def owned_albums(self) -> frozenset:
+        """Normalised (artist, album) of every row, ignoring other columns."""
+        return frozenset(
+            (
+                normalise_name(record.get("artist")),
+                normalise_name(record.get("album_title")),
+            )
+            for record in self.recommender.sheeter.store.iter_records()
+        )
+
+    async def check_collection(self):
+        """
+        Note when the owned albums change, and regenerate once they have
+        been unchanged for settle_seconds.
+        """
+        version = self.recommender.sheeter.store.version
+        if version != self.collection_version:
+            self.collection_version = version
+            owned = await asyncio.to_thread(self.owned_albums)
+
+            if self.owned is None:
+                self.owned = owned
+            elif owned != self.owned:
+                self.owned = owned
+                self.owned_changed_at = time.monotonic()
+
+        if (
+            self.owned_changed_at is not None
+            and time.monotonic() - self.owned_changed_at >= self.settle_seconds
+        ):
+            logger.info("Collection changed, regenerating recommendations")
+            self.owned_changed_at = None
+            self.reset()
+
+    def reset(self):
+        """Drop pooled recommendations and forget what was served."""
+        self.generation += 1
+        self.refills = {}
+
+        for distance in self.distances:
+            self.pools[distance].clear()
+            self.seen[distance].clear()
+            self.recent[distance].clear()
+
+    async def take(self, distance: int, n: int) -> list:
+        """
+        Take n recommendations for a distance. Served from the pool when it
+        has enough, otherwise waits for a refill.
+        """
+        pool = self.pools[distance]
+
+        while len(pool) < n:
+            before = len(pool)
+            await self.refill(distance)
+            if len(pool) == before:
+                break  # Model returned nothing new, serve what there is
+
+        albums = [pool.popleft() for _ in range(min(n, len(pool)))]
+        self.refill_if_low(distance)
+
+        return albums
+
+    def refill_if_low(self, distance: int):
+        """Start a background refill if the pool is below the low water mark."""
+        if len(self.pools[distance]) < self.low_water:
+            self.refill(distance)
+
+    def refill(self, distance: int) -> asyncio.Task:
+        """Refill task for a distance, shared if one is already running."""
+        task = self.refills.get(distance)
+        if task is None or task.done():
+            task = asyncio.create_task(self._refill(distance))
+            self.refills[distance] = task
+        return task
+
+    async def _refill(self, distance: int):
+        generation = self.generation
+        try:
+            results = await self.recommender.arecommend_albums(
+                taste_distance=distance,
+                n_suggestions=10,
+                exclude=list(self.recent[distance]),
+            )
+        except Exception as e:
+            logger.error(f"Recommendation refill failed for distance {distance}: {e}")
+            return
+
+        if generation != self.generation:
+            # Generated for the old collection, wait on a fresh refill instead
+            await self.refill(distance)
+            return
+
+        n_added = self.add_to_pool(distance, results.albums)
+
+        if not n_added and results.albums:
+            # Only repeats came back, let older suggestions be served again
+            # rather than leaving the pool to run dry
+            logger.info(f"No new recommendations for distance {distance}, resetting")
+            self.seen[distance] = {album_key(album) for album in self.pools[distance]}
+            n_added = self.add_to_pool(distance, results.albums)
+
+        logger.info(
+            f"Added {n_added} recommendations for distance {distance} "
+            f"(pool size {len(self.pools[distance])})"
+        )
+
+    def add_to_pool(self, distance: int, albums: list) -> int:
+        """Pool albums not already seen for a distance. Returns number added."""
+        n_added = 0
+        for album in albums:
+            key = album_key(album)
+            if key not in self.seen[distance]:
+                self.seen[distance].add(key)
+                self.recent[distance].append(album)
+                self.pools[distance].append(album)
+                n_added += 1
+        return n_added
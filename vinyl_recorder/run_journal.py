@@ -0,0 +1,147 @@
+"""
+Append-only journal of per-image progress through a bulk run.
+
+Each step (identified, appended, duplicate, enriched, enrichment written)
+is written as one JSON line and fsynced before the run moves on, so after a
+crash a re-run can pick up paid-for identification and Discogs results
+instead of repeating the calls. The last line for an image wins.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from vinyl_recorder.config import Config, get_logger
+from vinyl_recorder.vinyl_cover_identifier import VinylData
+
+logger = get_logger()
+
+IDENTIFIED = "identified"  # LLM result saved, not yet in the sheet
+APPENDED = "appended"  # Row appended to the sheet
+DUPLICATE = "duplicate"  # Album already in the sheet, row not appended
+ENRICHED = "enriched"  # Discogs updates saved, not yet written to the sheet
+ENRICHMENT_WRITTEN = "enrichment_written"  # Discogs updates written to the sheet
+
+
+class RunJournal:
+    def __init__(self, path=None):
+        self.path = Path(
+            path or Config.CACHE_DIR / f"bulk_journal_{Config.APP_ENV}.jsonl"
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+        # {image name: latest entry}, enrichment kept separately as it
+        # follows appended rather than replacing it. Only enrichments not
+        # yet written are kept, so a row cleared by hand isn't refilled
+        self.entries = {}
+        self.enrichments = {}
+        self.load()
+
+        self.file = open(self.path, "a")
+        if self.file.tell():
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read() != b"\n":
+                    # Don't run on from a partial last line
+                    self.file.write("\n")
+
+    def load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partial last line from a crash mid-write
+                    logger.warning(f"Skipping unreadable journal line in {self.path}")
+                    continue
+                self._apply(entry)
+
+        logger.info(f"Loaded run journal with {len(self.entries)} images")
+
+    def _apply(self, entry: dict):
+        if entry["state"] == ENRICHED:
+            self.enrichments[entry["image"]] = entry["updates"]
+        elif entry["state"] == ENRICHMENT_WRITTEN:
+            self.enrichments.pop(entry["image"], None)
+        else:
+            self.entries[entry["image"]] = entry
+
+    def write(self, image_name: str, state: str, **data):
+        entry = {"image": image_name, "state": state, "time": time.time(), **data}
+        with self.lock:
+            self._apply(entry)
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    # ==== RECORD ==== #
+    def record_identified(self, image_name: str, result: VinylData):
+        self.write(image_name, IDENTIFIED, result=result.model_dump())
+
+    def record_appended(self, image_names: list):
+        for image_name in image_names:
+            self.write(image_name, APPENDED)
+
+    def record_duplicates(self, image_names: list):
+        for image_name in image_names:
+            self.write(image_name, DUPLICATE)
+
+    def record_enriched(self, image_name: str, updates: dict):
+        self.write(image_name, ENRICHED, updates=updates)
+
+    def record_enrichments_written(self, image_names: list):
+        for image_name in image_names:
+            self.write(image_name, ENRICHMENT_WRITTEN)
+
+    # ==== LOOKUP ==== #
+    def state(self, image_name: str) -> str:
+        entry = self.entries.get(image_name)
+        return entry["state"] if entry else None
+
+    def identified_result(self, image_name: str) -> VinylData:
+        """Saved identification for an image not yet appended, else None."""
+        entry = self.entries.get(image_name)
+        if entry and entry["state"] == IDENTIFIED:
+            return VinylData.model_validate(entry["result"])
+        return None
+
+    def enrichment(self, image_name: str) -> dict:
+        """Saved Discogs updates not yet written to the sheet, else None."""
+        return self.enrichments.get(image_name)
+
+    def clear(self):
+        """Forget all progress, e.g. to start a fresh run."""
+        with self.lock:
+            self.entries = {}
+            self.enrichments = {}
+            self.file.truncate(0)
+
+    def compact(self):
+        """
+        Rewrite the journal with only the latest entries per image, dropping
+        enrichments that have been written.
+        """
+        with self.lock:
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + "\n")
+                for image_name, updates in self.enrichments.items():
+                    f.write(
+                        json.dumps(
+                            {"image": image_name, "state": ENRICHED, "updates": updates}
+                        )
+                        + "\n"
+                    )
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.file.close()
+            os.replace(tmp_path, self.path)
+            self.file = open(self.path, "a")
@@ -2,11 +2,10 @@
 Telegram bot for identifying and adding vinyl albums to collection.
 """
 
-import base64
 from datetime import datetime
-import json
 import asyncio
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import (
@@ -19,10 +18,13 @@ from telegram.ext import (
 )
 from vinyl_recorder.config import Config
 from vinyl_recorder.vinyl_cover_identifier import VinylIdentifier
+from vinyl_recorder.image_prep import prepare_image
 from vinyl_recorder.discogs import DiscogEnricher
 from vinyl_recorder.collection_tracker import CollectionTracker
 from vinyl_recorder.ghseets import GoogleSheeter
-from vinyl_recorder.album_recommender import AlbumRecommender
+from vinyl_recorder.album_recommender import AlbumRecommender, RecommendedAlbums
+from vinyl_recorder.recommendation_pool import RecommendationPool
+from vinyl_recorder.pending_store import PendingStore
 
 import logging
 
@@ -55,13 +57,29 @@ class VinylBot:
         self.tracker = tracker
         self.recommender = recommender
         self.bot_token = Config.bot_token()
-        self.pending_photos = {}  # {user_id: {image data and results}}
+        # {user_id: {image data and results}}, bounded and expiring
+        self.pending_photos = PendingStore(on_evict=self.cancel_pending_task)
+        # {user_id: photos received but not yet prompted for}, see handle_photo
+        self.photo_batches = {}
+        self.recommendation_pool = RecommendationPool(recommender)
+
+        # Sheets, LLM and Discogs clients are blocking so they run here,
+        # keeping the event loop free to serve other users
+        self.executor = ThreadPoolExecutor(
+            max_workers=Config.BOT_WORKERS, thread_name_prefix="vinyl-bot"
+        )
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call on the bot's executor and await the result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
         await update.message.reply_text(
             "🎵 *Vinyl Collection Bot*\n\n"
             "Send a photo 📸 of an album cover to this bot. It will send get to an LLM for identification.\n"
+            "Send several photos at once to identify a stack of albums together.\n"
             "Follwing this the album can optionally be added to the overall collection in google sheets.\n"
             "See links for sheet and website.\n\n"
             "Commands:\n"
@@ -108,15 +126,21 @@ class VinylBot:
         _, distance = query.data.split(":")
         distance = int(distance)
 
-        await query.edit_message_text("🔍 Recommending albums.. please wait")
-
         logger.info(f"Recommending albums for user {user_id}")
 
-        results = self.recommender.recommend_albums(
-            taste_distance=distance, n_suggestions=5
-        )
+        # Usually served straight from the precomputed pool
+        if len(self.recommendation_pool.pools[distance]) < 5:
+            await query.edit_message_text("🔍 Recommending albums.. please wait")
+
+        recommended = await self.recommendation_pool.take(distance, n=5)
+
+        if not recommended:
+            await query.edit_message_text(
+                "❌ Couldn't get recommendations right now. Please try again."
+            )
+            return
 
-        albums = recommender.parse_albums(results)
+        albums = self.recommender.parse_albums(RecommendedAlbums(albums=recommended))
 
         message = "Recommended Albums:\n\n"
         message += albums
@@ -124,7 +148,12 @@ class VinylBot:
         await query.edit_message_text(message)
 
     async def handle_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle incoming photo - ask if user wants to identify."""
+        """
+        Handle incoming photo. Identification starts straight away in the
+        background so the result is usually ready by the time the user taps
+        Yes. Photos sent together (an album or several at once) are collected
+        for a short window and handled as one batch.
+        """
         user_id = update.effective_user.id
 
         # Get the largest photo size
@@ -132,36 +161,135 @@ class VinylBot:
 
         # Download photo
         photo_file = await photo.get_file()
-        photo_bytes = await photo_file.download_as_bytearray()
+        # bytes rather than the bytearray so image decoding can share the buffer
+        photo_bytes = bytes(await photo_file.download_as_bytearray())
+
+        collecting = self.photo_batches.get(user_id)
+        if collecting is None:
+            # New photos replace anything still pending, drop its work
+            self.discard_pending(user_id)
+            collecting = self.photo_batches[user_id] = {"photos": [], "timer": None}
+
+        # Only the raw photo is held, it's downscaled and encoded inside
+        # the task and released once identification is done
+        collecting["photos"].append(
+            {
+                "task": self.start_speculative(self.identify_and_lookup(photo_bytes)),
+                "size": len(photo_bytes),
+                "timestamp": datetime.now(),
+            }
+        )
+
+        # Wait for more photos before replying
+        if collecting["timer"]:
+            collecting["timer"].cancel()
+        collecting["timer"] = asyncio.create_task(
+            self.finish_photos(user_id, update.message)
+        )
 
-        # Convert to base64
-        image_base64 = base64.b64encode(photo_bytes).decode("utf-8")
+    async def finish_photos(self, user_id: int, message):
+        """Once no more photos arrive, prompt for one photo or summarise a batch."""
+        await asyncio.sleep(Config.BOT_PHOTO_BATCH_SECONDS)
+        photos = self.photo_batches.pop(user_id)["photos"]
 
         # Generate image name
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        image_name = f"telegram_{timestamp}.jpg"
-
-        # Store temporarily
-        self.pending_photos[user_id] = {
-            "image_base64": image_base64,
-            "image_name": image_name,
-            "timestamp": datetime.now(),
-        }
+        timestamp = photos[0]["timestamp"].strftime("%Y%m%d_%H%M%S")
 
-        # Create inline keyboard
-        keyboard = [
-            [
-                InlineKeyboardButton("🎵 Yes, identify", callback_data="identify_yes"),
-                InlineKeyboardButton("❌ No", callback_data="identify_no"),
+        try:
+            if len(photos) > 1:
+                await self.identify_batch(user_id, message, photos, timestamp)
+                return
+
+            # Store temporarily
+            task = photos[0]["task"]
+            pending = {
+                "image_name": f"telegram_{timestamp}.jpg",
+                "timestamp": photos[0]["timestamp"],
+                "task": task,
+            }
+            self.store_pending(user_id, pending, size=photos[0]["size"])
+
+            # Create inline keyboard
+            keyboard = [
+                [
+                    InlineKeyboardButton(
+                        "🎵 Yes, identify", callback_data="identify_yes"
+                    ),
+                    InlineKeyboardButton("❌ No", callback_data="identify_no"),
+                ]
             ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await update.message.reply_text(
-            "🎸 Got your album cover!\n\nShould I identify this album?",
-            reply_markup=reply_markup,
+            await message.reply_text(
+                "🎸 Got your album cover!\n\nShould I identify this album?",
+                reply_markup=reply_markup,
+            )
+
+        except Exception as e:
+            logger.error(f"Error handling photos from user {user_id}: {e}")
+            await message.reply_text(f"❌ Error handling photos: {str(e)}")
+
+    def store_pending(self, user_id: int, pending: dict, size: int):
+        """Hold a pending entry until its photo bytes are no longer needed."""
+        self.pending_photos.put(user_id, pending, size=size)
+        pending["task"].add_done_callback(
+            lambda _: self.pending_photos.set_size(user_id, 0, entry=pending)
         )
 
+    # ==== SPECULATIVE PIPELINE ==== #
+    def start_speculative(self, coro) -> asyncio.Task:
+        """Run coro as a task whose errors are only raised if someone awaits it."""
+        task = asyncio.create_task(coro)
+        # Mark exceptions as retrieved so abandoned failures don't log warnings
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def identify_and_lookup(self, photo_bytes: bytes) -> tuple:
+        """
+        Downscale, identify with the LLM, then check for a duplicate and
+        search Discogs at the same time.
+        Returns (vinyl_data, is_duplicate, discogs_data).
+        """
+        prepared = await self.run_blocking(prepare_image, photo_bytes)
+        vinyl_data = await self.identifier.aidentify(image_base64=prepared.image_base64)
+
+        if not vinyl_data.success:
+            return vinyl_data, False, None
+
+        is_duplicate, discogs_data = await asyncio.gather(
+            self.run_blocking(
+                self.tracker.is_duplicate, vinyl_data.artist, vinyl_data.album_title
+            ),
+            self.run_blocking(
+                self.enricher.search_discogs,
+                artist=vinyl_data.artist,
+                album=vinyl_data.album_title,
+            ),
+        )
+        return vinyl_data, is_duplicate, discogs_data
+
+    def discard_pending(self, user_id: int):
+        """Forget a user's pending photo and cancel work still running for it."""
+        pending = self.pending_photos.pop(user_id)
+        if pending:
+            self.cancel_pending_task(pending)
+
+    def cancel_pending_task(self, pending: dict):
+        if not pending["task"].done():
+            pending["task"].cancel()
+            logger.info(
+                f"Cancelled identification for "
+                f"{pending.get('image_name') or pending['image_names']}"
+            )
+
+    async def sweep_pending(self):
+        """Expire abandoned photos even when no one is using the bot."""
+        while True:
+            await asyncio.sleep(Config.PENDING_SWEEP_SECONDS)
+            self.pending_photos.expire()
+            if len(self.pending_photos):
+                logger.info(f"Pending photos: {self.pending_photos.gauges}")
+
     async def handle_identify_yes(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ):
@@ -171,53 +299,38 @@ class VinylBot:
         user_id = update.effective_user.id
 
         # Check if we have pending photo
-        if user_id not in self.pending_photos:
+        pending = self.get_pending_photo(user_id)
+        if not pending:
             await query.edit_message_text("❌ No pending photo. Please send a new one.")
             return
 
-        pending = self.pending_photos[user_id]
-
         # Show processing message
-        await query.edit_message_text("🔍 Identifying album... please wait")
+        if not pending["task"].done():
+            await query.edit_message_text("🔍 Identifying album... please wait")
 
         try:
-            # Step 1: Identify with LLM
+            # Started when the photo arrived, usually finished by now
             logger.info(f"Identifying album for user {user_id}")
-            vinyl_data = self.identifier.identify(image_base64=pending["image_base64"])
+            vinyl_data, is_duplicate, discogs_data = await pending["task"]
 
             if not vinyl_data.success:
                 await query.edit_message_text(
                     "❌ Could not identify the album.\n"
                     "Try a clearer photo with better lighting?"
                 )
-                del self.pending_photos[user_id]
+                self.discard_pending(user_id)
                 return
 
-            # Update message
-            await query.edit_message_text(
-                f"✓ Identified as {vinyl_data.artist} - {vinyl_data.album_title}\n"
-                f"🔍 Looking up details on Discogs..."
-            )
-
-            # Step 2: Check for duplicate
-            if self.sheeter.is_duplicate(vinyl_data.artist, vinyl_data.album_title):
+            if is_duplicate:
                 await query.edit_message_text(
                     f"⚠️ *You already have this album!*\n\n"
                     f"Artist: {vinyl_data.artist}\n"
                     f"Album: {vinyl_data.album_title}",
                     parse_mode="Markdown",
                 )
-                del self.pending_photos[user_id]
+                self.discard_pending(user_id)
                 return
 
-            # Step 3: Enrich with Discogs
-            logger.info(
-                f"Enriching with Discogs: {vinyl_data.artist} - {vinyl_data.album_title}"
-            )
-            discogs_data = self.enricher.search_discogs(
-                artist=vinyl_data.artist, album=vinyl_data.album_title
-            )
-
             # Store results
             pending["vinyl_data"] = vinyl_data
             pending["discogs_data"] = discogs_data
@@ -240,13 +353,30 @@ class VinylBot:
                 message, reply_markup=reply_markup, parse_mode="Markdown"
             )
 
+        except asyncio.CancelledError:
+            # Replaced by a newer photo while waiting, that photo gets its own prompt
+            if asyncio.current_task().cancelling():
+                raise
+            await query.edit_message_text("❌ Replaced by a newer photo.")
+
         except Exception as e:
             logger.error(f"Error identifying album: {e}")
             await query.edit_message_text(
                 f"❌ Error during identification: {str(e)}\nPlease try again."
             )
-            if user_id in self.pending_photos:
-                del self.pending_photos[user_id]
+            self.discard_pending(user_id)
+
+    def get_pending_photo(self, user_id: int, identified: bool = False) -> dict:
+        """
+        The user's single pending photo, or None if there isn't one (or it
+        has been replaced by a batch). With identified, only once the
+        results are ready to add.
+        """
+        pending = self.pending_photos.get(user_id)
+        if pending and "image_name" in pending:
+            if not identified or "vinyl_data" in pending:
+                return pending
+        return None
 
     async def handle_identify_no(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -256,8 +386,7 @@ class VinylBot:
         await query.answer()
         user_id = update.effective_user.id
 
-        if user_id in self.pending_photos:
-            del self.pending_photos[user_id]
+        self.discard_pending(user_id)
 
         await query.edit_message_text("❌ Cancelled. Send another photo anytime!")
 
@@ -269,11 +398,11 @@ class VinylBot:
         await query.answer()
         user_id = update.effective_user.id
 
-        if user_id not in self.pending_photos:
+        pending = self.get_pending_photo(user_id, identified=True)
+        if not pending:
             await query.edit_message_text("❌ No pending album. Please start over.")
             return
 
-        pending = self.pending_photos[user_id]
         vinyl_data = pending["vinyl_data"]
         discogs_data = pending.get("discogs_data")
 
@@ -285,26 +414,16 @@ class VinylBot:
             logger.info(
                 f"Adding to collection: {vinyl_data.artist} - {vinyl_data.album_title}"
             )
-            self.tracker.add_result_telegram(
-                image_name=pending["image_name"], result=vinyl_data
+            # One append with the Discogs columns already filled in
+            await self.run_blocking(
+                self.tracker.add_result_telegram,
+                image_name=pending["image_name"],
+                result=vinyl_data,
+                discogs_updates=(
+                    self.enricher.to_row_updates(discogs_data) if discogs_data else None
+                ),
             )
 
-            # If we have Discogs data, enrich immediately
-            if discogs_data:
-                # Find the row we just added
-                image_name = pending["image_name"]
-                row_num = self.sheeter.find_row_by_image_name(image_name)
-
-                if row_num:
-                    self.sheeter.update_row_cells(
-                        row_num,
-                        {
-                            "discogs_title": discogs_data.discogs_title,
-                            "tracklist": json.dumps(discogs_data.tracklist),
-                            "image_url": discogs_data.image_url,
-                        },
-                    )
-
             # Success message
             success_msg = (
                 f"✅ *Added to your collection!*\n\n"
@@ -326,8 +445,7 @@ class VinylBot:
             )
         finally:
             # Clean up
-            if user_id in self.pending_photos:
-                del self.pending_photos[user_id]
+            self.discard_pending(user_id)
 
     async def handle_confirm_cancel(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -337,11 +455,216 @@ class VinylBot:
         await query.answer()
         user_id = update.effective_user.id
 
-        if user_id in self.pending_photos:
-            del self.pending_photos[user_id]
+        self.discard_pending(user_id)
 
         await query.edit_message_text("❌ Cancelled. Send another photo anytime!")
 
+    # ==== BATCHES OF PHOTOS ==== #
+    async def identify_batch(self, user_id: int, message, photos: list, timestamp: str):
+        """
+        Wait for every photo in a batch to be identified, then send one
+        summary with a toggle per album and a button to add them all.
+        """
+        task = asyncio.gather(
+            *(photo["task"] for photo in photos), return_exceptions=True
+        )
+        pending = {
+            "image_names": [
+                f"telegram_{timestamp}_{i}.jpg" for i in range(1, len(photos) + 1)
+            ],
+            "timestamp": photos[0]["timestamp"],
+            "task": task,
+            "results": None,
+            "addable": set(),
+            "repeats": set(),
+            "selected": set(),
+        }
+        self.store_pending(
+            user_id, pending, size=sum(photo["size"] for photo in photos)
+        )
+
+        status = await message.reply_text(
+            f"📚 Got {len(photos)} album covers, identifying them..."
+        )
+
+        try:
+            results = await task
+        except asyncio.CancelledError:
+            await status.edit_text("❌ Replaced by newer photos.")
+            return
+
+        pending["results"] = [
+            None if isinstance(result, Exception) else result for result in results
+        ]
+        # Everything that can be added starts ticked
+        pending["addable"], pending["repeats"] = self.find_addable(pending["results"])
+        pending["selected"] = set(pending["addable"])
+
+        await status.edit_text(
+            self.format_batch_message(pending),
+            reply_markup=self.batch_keyboard(pending),
+        )
+
+    def find_addable(self, results: list) -> tuple:
+        """
+        Indices of results that can be added: identified, not already owned,
+        and not a repeat of an earlier photo in the batch (e.g. the front and
+        back of one record). Each photo was checked against the sheet on its
+        own, so repeats within the batch are caught here.
+        Returns (addable indices, repeated indices).
+        """
+        addable, repeats, albums = set(), set(), set()
+
+        for i, result in enumerate(results):
+            if not result or not result[0].success or result[1]:
+                continue
+
+            key = self.tracker.album_key(result[0].artist, result[0].album_title)
+            if key in albums:
+                repeats.add(i)
+            else:
+                albums.add(key)
+                addable.add(i)
+
+        return addable, repeats
+
+    def format_batch_message(self, pending: dict) -> str:
+        message = f"📚 Found {len(pending['results'])} albums:\n\n"
+
+        for i, result in enumerate(pending["results"]):
+            if not result or not result[0].success:
+                message += f"{i + 1}. ❌ Could not identify\n"
+                continue
+
+            vinyl_data, is_duplicate, discogs_data = result
+            album = f"{vinyl_data.artist} - {vinyl_data.album_title}"
+            if is_duplicate:
+                message += f"{i + 1}. ⚠️ {album} (already in collection)\n"
+            elif i in pending["repeats"]:
+                message += f"{i + 1}. ⚠️ {album} (duplicate in this batch)\n"
+            else:
+                tick = "✅" if i in pending["selected"] else "⬜"
+                found = "" if discogs_data else " (not on Discogs)"
+                message += f"{i + 1}. {tick} {album}{found}\n"
+
+        message += "\nTap an album to include or skip it."
+        return message
+
+    def batch_keyboard(self, pending: dict) -> InlineKeyboardMarkup:
+        keyboard = []
+        for i in sorted(pending["addable"]):
+            vinyl_data = pending["results"][i][0]
+            tick = "✅" if i in pending["selected"] else "⬜"
+            label = f"{tick} {i + 1}. {vinyl_data.artist} - {vinyl_data.album_title}"
+            keyboard.append(
+                [InlineKeyboardButton(label[:60], callback_data=f"batch_toggle:{i}")]
+            )
+
+        keyboard.append(
+            [
+                InlineKeyboardButton(
+                    f"✅ Add {len(pending['selected'])} to Collection",
+                    callback_data="batch_add",
+                ),
+                InlineKeyboardButton("❌ Cancel", callback_data="batch_cancel"),
+            ]
+        )
+        return InlineKeyboardMarkup(keyboard)
+
+    def get_pending_batch(self, user_id: int) -> dict:
+        """The user's identified batch, or None if there isn't one."""
+        pending = self.pending_photos.get(user_id)
+        if pending and "image_names" in pending and pending["results"] is not None:
+            return pending
+        return None
+
+    async def handle_batch_toggle(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """Include or skip one album in the batch."""
+        query = update.callback_query
+        await query.answer()
+        pending = self.get_pending_batch(update.effective_user.id)
+
+        if not pending:
+            await query.edit_message_text("❌ No pending albums. Please start over.")
+            return
+
+        i = int(query.data.split(":")[1])
+        if i in pending["addable"]:
+            pending["selected"] ^= {i}
+
+        await query.edit_message_text(
+            self.format_batch_message(pending),
+            reply_markup=self.batch_keyboard(pending),
+        )
+
+    async def handle_batch_add(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """Add every selected album in the batch with one sheet append."""
+        query = update.callback_query
+        await query.answer()
+        user_id = update.effective_user.id
+        pending = self.get_pending_batch(user_id)
+
+        if not pending:
+            await query.edit_message_text("❌ No pending albums. Please start over.")
+            return
+
+        items = []
+        for i in sorted(pending["selected"]):
+            vinyl_data, _, discogs_data = pending["results"][i]
+            discogs_updates = (
+                self.enricher.to_row_updates(discogs_data) if discogs_data else None
+            )
+            items.append((pending["image_names"][i], vinyl_data, discogs_updates))
+
+        if not items:
+            await query.edit_message_text("Nothing selected. Send more photos anytime!")
+            self.discard_pending(user_id)
+            return
+
+        await query.edit_message_text(
+            f"🔍 Adding {len(items)} albums to Google sheets... please wait"
+        )
+
+        try:
+            logger.info(f"Adding {len(items)} albums to collection for user {user_id}")
+            added = set(
+                await self.run_blocking(self.tracker.add_results_telegram, items)
+            )
+
+            albums = "\n".join(
+                f"💿 {vinyl_data.artist} - {vinyl_data.album_title}"
+                for image_name, vinyl_data, _ in items
+                if image_name in added
+            )
+            message = f"✅ Added {len(added)} albums to your collection!\n\n{albums}"
+            if len(added) < len(items):
+                n_skipped = len(items) - len(added)
+                message += f"\n\n⚠️ Skipped {n_skipped} already in collection"
+            await query.edit_message_text(message)
+
+        except Exception as e:
+            logger.error(f"Error adding batch to collection: {e}")
+            await query.edit_message_text(
+                f"❌ Error adding to collection: {str(e)}\n"
+                "Please try again or add manually."
+            )
+        finally:
+            self.discard_pending(user_id)
+
+    async def handle_batch_cancel(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """User cancelled the batch - discard results."""
+        query = update.callback_query
+        await query.answer()
+        self.discard_pending(update.effective_user.id)
+
+        await query.edit_message_text("❌ Cancelled. Send more photos anytime!")
+
     def format_results_message(self, vinyl_data, discogs_data):
         """Format identification results for display."""
         message = "🎸 *Found Album:*\n\n"
@@ -386,12 +709,23 @@ class VinylBot:
             ]
         )
 
+        # Start precomputing recommendations in the background
+        self.recommendation_pool.start()
+        self.sweep_task = asyncio.create_task(self.sweep_pending())
+
     def start(self):
         """Start the bot."""
         logger.info("Starting Vinyl Bot...")
 
         # Create application
-        application = Application.builder().token(self.bot_token).build()
+        # Process updates concurrently so one slow identification doesn't
+        # hold up every other user
+        application = (
+            Application.builder()
+            .token(self.bot_token)
+            .concurrent_updates(Config.BOT_CONCURRENT_UPDATES)
+            .build()
+        )
 
         # Add handlers
         application.add_handler(CommandHandler("start", self.start_command))
@@ -413,6 +747,15 @@ class VinylBot:
         application.add_handler(
             CallbackQueryHandler(self.handle_confirm_cancel, pattern="^confirm_cancel$")
         )
+        application.add_handler(
+            CallbackQueryHandler(self.handle_batch_toggle, pattern="^batch_toggle:")
+        )
+        application.add_handler(
+            CallbackQueryHandler(self.handle_batch_add, pattern="^batch_add$")
+        )
+        application.add_handler(
+            CallbackQueryHandler(self.handle_batch_cancel, pattern="^batch_cancel$")
+        )
 
         # Callback for recommender
         application.add_handler(
@@ -1,6 +1,8 @@
-import base64
+import asyncio
 from vinyl_recorder.llm_client import get_llm_client
-from vinyl_recorder.config import get_logger
+from vinyl_recorder.image_prep import prepare_image
+from vinyl_recorder.identification_cache import IdentificationCache
+from vinyl_recorder.config import Config, get_logger
 from pydantic import BaseModel
 from typing import Optional
 
@@ -22,29 +24,28 @@ class VinylData(BaseModel):
 
 # ==== IDENTIFIER ==== #
 class VinylIdentifier:
-    def __init__(self, llm_choice: str = "openai"):
+    def __init__(
+        self,
+        llm_choice: str = "openai",
+        image_detail: str = Config.OPENAI_IMAGE_DETAIL,
+        use_cache: bool = True,
+    ):
         logger.info("Starting Vinly Identifier")
 
         self.llm = get_llm_client(llm=llm_choice)
+        self.image_detail = image_detail
+        self.cache = IdentificationCache() if use_cache else None
 
     def load_image_base64(self, image_path: str) -> str:
-        "Convert image to base64 for llm."
+        "Downscale image and convert to base64 for llm."
 
-        # Read and encode the image
         with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode("utf-8")
+            prepared = prepare_image(image_file.read())
 
-        return image_data
+        return prepared.image_base64
 
-    def identify(self, image_base64: str) -> VinylData:
-        """
-        Pass base64 image to llm for identification.
-
-        :param image_base64: Image in base64
-        :type image_base64: str
-        :return: results of llm call
-        :rtype: VinylData
-        """
+    def build_messages(self, image_base64: str) -> list:
+        """Prompt messages asking the llm to identify one album cover."""
 
         system_prompt = """
         You are an expert at identifying vinyl album covers. 
@@ -70,16 +71,65 @@ class VinylIdentifier:
                     },
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"},
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_base64}",
+                            "detail": self.image_detail,
+                        },
                     },
                 ],
             },
         ]
 
-        result = self.llm.parse_completion(messages=messages, response_format=VinylData)
+        return messages
+
+    def identify(self, image_base64: str) -> VinylData:
+        """
+        Pass base64 image to llm for identification.
+
+        :param image_base64: Image in base64
+        :type image_base64: str
+        :return: results of llm call
+        :rtype: VinylData
+        """
+
+        if self.cache:
+            cached = self.cache.get(image_base64, VinylData)
+            if cached:
+                return cached
+
+        result = self.llm.parse_completion(
+            messages=self.build_messages(image_base64), response_format=VinylData
+        )
+
+        self.cache_result(image_base64, result)
 
         return result
 
+    async def aidentify(self, image_base64: str) -> VinylData:
+        """
+        Async version of identify for use from the telegram bot.
+        Cache lookups (SQLite and perceptual hashing) run in a thread so
+        they don't block the event loop.
+        """
+
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get, image_base64, VinylData)
+            if cached:
+                return cached
+
+        result = await self.llm.aparse_completion(
+            messages=self.build_messages(image_base64), response_format=VinylData
+        )
+
+        await asyncio.to_thread(self.cache_result, image_base64, result)
+
+        return result
+
+    def cache_result(self, image_base64: str, result: VinylData):
+        # Only cache identifications, a failed one may be worth retrying
+        if self.cache and result.success:
+            self.cache.put(image_base64, result)
+
     def identify_image(self, image_path: str) -> VinylData:
         """
         Load photo as base64 and identify album cover with llm call.
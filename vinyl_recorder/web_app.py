@@ -3,64 +3,124 @@ Simple web app to display vinyl collection.
 Run locally: uvicorn vinyl_recorder.web_app:app --reload
 """
 
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-import json
+from fastapi.responses import HTMLResponse, Response
 from vinyl_recorder.ghseets import GoogleSheeter
-from vinyl_recorder.config import get_logger
+from vinyl_recorder.collection_snapshot import (
+    CollectionSnapshot,
+    StaleCursorError,
+    parse_album,
+)
+from vinyl_recorder.config import Config, get_logger
 
 logger = get_logger()
 
-app = FastAPI(title="Katie's Vinyl Collection")
+# Initialize sheeter and the snapshot served to requests
+sheeter = GoogleSheeter()
+snapshot = CollectionSnapshot(sheeter)
+
+
+async def refresh_snapshot_periodically():
+    """Re-sync from the sheet in the background so requests never wait on it."""
+    while True:
+        await asyncio.sleep(Config.SNAPSHOT_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(snapshot.refresh, sync=True)
+        except Exception as e:
+            logger.error(f"Snapshot refresh failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(snapshot.refresh)
+    task = asyncio.create_task(refresh_snapshot_periodically())
+    yield
+    task.cancel()
+
+
+app = FastAPI(title="Katie's Vinyl Collection", lifespan=lifespan)
 
 # Setup templates
 templates = Jinja2Templates(directory="vinyl_recorder/templates")
 
-# Initialize sheeter
-sheeter = GoogleSheeter()
-
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    """Main page showing the collection."""
-    # Get data from sheet
-    df = sheeter.refresh_df()
-
-    # Sort by artist (default)
-    df = df.sort_values("artist", key=lambda x: x.str.lower())
-
-    # Convert to list of dicts for template
-    albums = df.to_dict("records")
-
-    # Parse tracklist JSON strings
-    for album in albums:
-        if album.get("tracklist"):
-            try:
-                album["tracklist"] = json.loads(album["tracklist"])
-            except:
-                album["tracklist"] = []
-        else:
-            album["tracklist"] = []
+    """Main page showing the first page of the collection, the rest is fetched as you scroll."""
+    if snapshot.is_not_modified(request.headers, "html"):
+        return Response(status_code=304, headers=snapshot.cache_headers("html"))
+
+    page = snapshot.query(limit=Config.WEB_PAGE_SIZE)
 
     return templates.TemplateResponse(
-        "index.html", {"request": request, "albums": albums, "total_count": len(albums)}
+        request,
+        "index.html",
+        {
+            "albums": page["albums"],
+            "total_count": page["count"],
+            "next_cursor": page["next_cursor"],
+            "page_size": Config.WEB_PAGE_SIZE,
+        },
+        headers=snapshot.cache_headers("html"),
     )
 
 
 @app.get("/api/albums")
-async def get_albums():
-    """API endpoint to get albums as JSON (for future use)."""
-    df = sheeter.refresh_df()
-    albums = df.to_dict("records")
-
-    for album in albums:
-        if album.get("tracklist"):
-            try:
-                album["tracklist"] = json.loads(album["tracklist"])
-            except:
-                album["tracklist"] = []
-
+async def get_albums(
+    request: Request,
+    q: Optional[str] = None,
+    sort: str = "artist",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    fields: Optional[str] = None,
+):
+    """
+    API endpoint to get albums as JSON.
+    With no parameters returns the whole collection. Otherwise returns one page:
+        q: full text search terms, matched the same way as /api/search
+        sort: artist, album or year
+        cursor: next_cursor from the previous page, 409 if the collection
+            has changed since it was issued
+        limit: page size
+        fields: comma separated keys to return e.g. artist,album_title,image_url
+    """
+    if not request.query_params:
+        if snapshot.is_not_modified(request.headers, "json"):
+            return Response(status_code=304, headers=snapshot.cache_headers("json"))
+
+        return Response(
+            content=snapshot.json_bytes,
+            media_type="application/json",
+            headers=snapshot.cache_headers("json"),
+        )
+
+    try:
+        return await asyncio.to_thread(
+            snapshot.query,
+            q=q,
+            sort=sort,
+            cursor=cursor,
+            limit=limit or Config.WEB_PAGE_SIZE,
+            fields=fields.split(",") if fields else None,
+        )
+    except StaleCursorError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/search")
+async def search(q: str, limit: int = Query(20, ge=1, le=100)):
+    """
+    Full text search over artist, album title and track names.
+    Words match as prefixes, with small typos tolerated.
+    """
+    albums = [parse_album(record) for record in sheeter.search(q, limit)]
     return {"albums": albums, "count": len(albums)}
 
 